@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the step function of the gas simulation for all available engines.
+
+For small numbers of particles every engine is first checked against the reference `Particle`
+implementation of gas_simulation_solution.py. Afterwards steps/second and the peak memory are
+measured for each engine and number of particles. Every measurement runs in a forked process and
+the peak memory is the growth of its peak resident set size (RSS), so unlike tracemalloc it also
+contains the arrays that are allocated inside numba compiled kernels (Linux and macOS only).
+
+Usage examples:
+
+./gas_benchmark.py
+./gas_benchmark.py --sizes 40 1000 10000 --engines kernels --min-time 5
+./gas_benchmark.py --engines kernels verlet --delta-t 0.01 --skin 0.02
+"""
+
+import argparse
+import csv
+import multiprocessing
+import resource
+import sys
+import time
+
+import numpy as np
+
+import gas_kernels
+import gas_simulation_solution
+
+
+class ParticlesEngine:
+    """reference engine with one `Particle` object per particle"""
+
+    name = "particles"
+    max_n = 3000
+
+    def __init__(self, state, delta_t, L, r, collision_cool_down):
+        x, y, v_x, v_y, m, cool = state
+        self.particles = [
+            gas_simulation_solution.Particle(x[i], y[i], v_x[i], v_y[i], m[i]) for i in range(len(x))
+        ]
+        self.args = (delta_t, L, r, collision_cool_down)
+
+    def step(self):
+        gas_simulation_solution.step(self.particles, *self.args)
+
+    def state(self):
+        return gas_kernels.state_from_particles(self.particles)
+
+
+class KernelsEngine:
+    """flat arrays with the (numba compiled) kernels of gas_kernels.py"""
+
+    name = "kernels"
+    max_n = 30000 if gas_kernels.HAVE_NUMBA else 3000
+
+    def __init__(self, state, delta_t, L, r, collision_cool_down):
+        self.arrays = tuple(a.copy() for a in state)
+        self.args = (delta_t, L, r, collision_cool_down)
+
+    def step(self):
+        gas_kernels.step(*self.arrays, *self.args)
+
+    def state(self):
+        return self.arrays
+
+
+class VerletEngine(KernelsEngine):
+    """flat arrays with the kernels of gas_kernels.py and a Verlet neighbour list for the collisions"""
+
+    name = "verlet"
+    max_n = 300000 if gas_kernels.HAVE_NUMBA else 10000
+
+    def __init__(self, state, delta_t, L, r, collision_cool_down, skin=0.05):
+        super().__init__(state, delta_t, L, r, collision_cool_down)
+        self.neighbours = gas_kernels.VerletList(r, skin)
+        self.args = (delta_t, L, collision_cool_down)
+
+    def step(self):
+        self.neighbours.step(*self.arrays, *self.args)
+
+    def summary(self):
+        return (f"list rebuilt in {self.neighbours.rebuild_frequency:.1%} of the steps, "
+                f"{self.neighbours.n_pairs / len(self.arrays[0]):.1f} pairs/particle")
+
+
+ENGINES = {engine.name: engine for engine in (ParticlesEngine, KernelsEngine, VerletEngine)}
+
+
+def make_engine(engine_class, state, params, args):
+    """create an engine with the options from the command line that apply to it"""
+    options = {"skin": args.skin} if engine_class is VerletEngine else {}
+    return engine_class(state, *params, **options)
+
+
+def box_length(n_particles, args):
+    """box length for the given number of particles (constant density unless --fixed-box)"""
+    if args.fixed_box:
+        return args.box_length
+    return args.box_length * np.sqrt(n_particles / 40)
+
+
+def check_engines(engines, args):
+    """compare the state of all engines with the reference after some steps, returns True if all agree"""
+    L = box_length(args.check_n, args)
+    state = gas_kernels.random_state(args.check_n, L, np.random.default_rng(args.seed), random_mass=True)
+    params = (args.delta_t, L, args.r, args.collision_cool_down)
+
+    reference = ParticlesEngine(state, *params)
+    for _ in range(args.check_steps):
+        reference.step()
+    expected = reference.state()
+
+    all_ok = True
+    for engine_class in engines:
+        engine = make_engine(engine_class, state, params, args)
+        for _ in range(args.check_steps):
+            engine.step()
+        ok = all(np.allclose(a, b, rtol=1e-12, atol=1e-12) for a, b in zip(expected, engine.state()))
+        all_ok &= ok
+        print(f"{engine_class.name:>10}: {'ok' if ok else 'MISMATCH'} "
+              f"({args.check_n} particles, {args.check_steps} steps)"
+              + (f", {engine.summary()}" if hasattr(engine, "summary") else ""))
+    return all_ok
+
+
+def peak_rss():
+    """peak resident set size of this process in bytes"""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def measure(engine_class, n_particles, args):
+    """
+    returns steps/second, the peak memory in bytes and the summary of the engine (or None)
+
+    Runs in a forked process (see `main`): the peak memory is the growth of its peak RSS while the
+    initial state and the engine are created and the first two steps are done.
+    """
+    def run(n_particles):
+        L = box_length(n_particles, args)
+        params = (args.delta_t, L, args.r, args.collision_cool_down)
+        state = gas_kernels.random_state(n_particles, L, np.random.default_rng(args.seed))
+        engine = make_engine(engine_class, state, params, args)
+        engine.step()
+        engine.step()
+        return engine
+
+    # the peak RSS of a forked process starts at the current RSS of the benchmark; a small run
+    # first touches the pages of the libraries that the benchmark did not use yet, so only the
+    # memory for n_particles is counted
+    run(2)
+    before = peak_rss()
+    engine = run(n_particles)
+    peak_memory = peak_rss() - before
+
+    # timing (the kernels were already compiled by the correctness check)
+    n_steps = 0
+    start = time.perf_counter()
+    while n_steps < args.min_steps or time.perf_counter() - start < args.min_time:
+        engine.step()
+        n_steps += 1
+    steps_per_second = n_steps / (time.perf_counter() - start)
+    summary = engine.summary() if hasattr(engine, "summary") else None
+    return steps_per_second, peak_memory, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the gas simulation engines."
+    )
+    parser.add_argument(
+        "--engines", help="engines to benchmark", nargs="+", choices=list(ENGINES), default=list(ENGINES)
+    )
+    parser.add_argument(
+        "--sizes", help="numbers of particles", type=int, nargs="+", default=[40, 100, 1000, 10000, 100000]
+    )
+    parser.add_argument(
+        "--no-limits", help="also run engines for more particles than they can handle in reasonable time",
+        action="store_true",
+    )
+    parser.add_argument("--delta-t", help="the timestep of the simulation", type=float, default=0.1)
+    parser.add_argument("--box-length", help="length of the box for 40 particles", type=float, default=1.0)
+    parser.add_argument(
+        "--fixed-box", help="use --box-length for all sizes instead of keeping the density constant",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--r", help="maximal distance between particles for a collision to take place", type=float, default=0.03
+    )
+    parser.add_argument(
+        "--collision-cool-down",
+        help="number of iterations a particle is not allowed to collide again after a collision",
+        type=int,
+        default=3,
+    )
+    parser.add_argument(
+        "--skin", help="additional distance for the pairs in the Verlet neighbour list", type=float,
+        default=0.05,
+    )
+    parser.add_argument("--seed", help="seed for the initial states", type=int, default=0)
+    parser.add_argument("--min-time", help="minimal time (in seconds) per measurement", type=float, default=1.0)
+    parser.add_argument("--min-steps", help="minimal number of steps per measurement", type=int, default=3)
+    parser.add_argument("--check-n", help="number of particles for the correctness check", type=int, default=100)
+    parser.add_argument("--check-steps", help="number of steps for the correctness check", type=int, default=300)
+    parser.add_argument("--csv", help="also write the results to this csv file", default=None)
+    args = parser.parse_args()
+
+    engines = [ENGINES[name] for name in args.engines]
+    print("numba available:", gas_kernels.HAVE_NUMBA)
+    print("correctness check against the Particle reference:")
+    all_ok = check_engines(engines, args)
+    print()
+
+    results = []
+    print(f"{'engine':>10} {'N':>8} {'steps/s':>12} {'peak RSS':>14}")
+    for engine_class in engines:
+        for n_particles in args.sizes:
+            if n_particles > engine_class.max_n and not args.no_limits:
+                print(f"{engine_class.name:>10} {n_particles:>8} {'skipped':>12} {'':>14}")
+                continue
+            # in a fresh forked process: memory freed by earlier measurements could be reused
+            # without growing the RSS
+            with multiprocessing.get_context("fork").Pool(1) as pool:
+                steps_per_second, peak_memory, summary = pool.apply(
+                    measure, (engine_class, n_particles, args)
+                )
+            results.append((engine_class.name, n_particles, steps_per_second, peak_memory))
+            print(f"{engine_class.name:>10} {n_particles:>8} {steps_per_second:>12.4g} "
+                  f"{peak_memory / 2**20:>11.2f} MB" + (f"  ({summary})" if summary else ""))
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("engine", "n_particles", "steps_per_second", "peak_rss_bytes"))
+            writer.writerows(results)
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
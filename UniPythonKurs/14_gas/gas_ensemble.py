@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+"""
+Run ensembles of independent gas simulations for parameter sweeps on all cores.
+
+Every combination of the swept parameters is simulated `--runs` times with its own seed, the
+observables of all runs are aggregated with streaming statistics and written to one csv table.
+
+Usage example:
+
+./gas_ensemble.py --n-particles 40 100 --r 0.02 0.03 --mass equal random --runs 16 --output sweep.csv
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import itertools
+import math
+import os
+import sys
+
+import numpy as np
+
+import gas_kernels
+
+
+OBSERVABLES = ("energy_drift", "velocity_kurtosis", "mean_speed", "collision_rate")
+
+
+class RunningStats:
+    """
+    Mean and variance of a stream of values (Welford's algorithm), without storing the values
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def push(self, value):
+        """add a single value"""
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def std(self):
+        """sample standard deviation (nan for less than two values)"""
+        if self.n < 2:
+            return math.nan
+        return math.sqrt(self._m2 / (self.n - 1))
+
+
+def kinetic_energy(v_x, v_y, m):
+    """total kinetic energy of all particles"""
+    return 0.5 * np.sum(m * (v_x**2 + v_y**2))
+
+
+def velocity_kurtosis(v_x, v_y, m):
+    """
+    excess kurtosis of the mass weighted velocity components sqrt(m) * v
+
+    In equilibrium (Maxwell-Boltzmann distribution) the components are gaussian and this is 0,
+    the uniform initial velocities of `simulate` start at -1.2.
+    """
+    u = np.concatenate((v_x, v_y)) * np.sqrt(np.concatenate((m, m)))
+    u = u - u.mean()
+    return np.mean(u**4) / np.mean(u**2) ** 2 - 3
+
+
+def run_simulation(params, seed_sequence, skin=None):
+    """
+    Run one simulation without plotting and return a dictionary with its observables
+
+    params -- dictionary with n_particles, t, delta_t, L, r, collision_cool_down and mass
+    seed_sequence -- numpy SeedSequence to draw the initial state from
+    skin -- if given, find the collisions with a Verlet neighbour list with this skin distance,
+            the fraction of the steps in which the list was rebuilt is returned as an additional
+            observable
+    """
+    rng = np.random.default_rng(seed_sequence)
+    x, y, v_x, v_y, m, cool = gas_kernels.random_state(
+        params["n_particles"], params["L"], rng, random_mass=params["mass"] == "random"
+    )
+    energy_start = kinetic_energy(v_x, v_y, m)
+
+    neighbours = None if skin is None else gas_kernels.VerletList(params["r"], skin)
+    n_collisions = 0
+    n_steps = len(np.arange(0, params["t"], params["delta_t"]))  # same number of steps as `simulate`
+    for _ in range(n_steps):
+        if neighbours is None:
+            n_collisions += gas_kernels.step(
+                x, y, v_x, v_y, m, cool,
+                params["delta_t"], params["L"], params["r"], params["collision_cool_down"],
+            )
+        else:
+            n_collisions += neighbours.step(
+                x, y, v_x, v_y, m, cool, params["delta_t"], params["L"], params["collision_cool_down"]
+            )
+
+    observables = {
+        "energy_drift": kinetic_energy(v_x, v_y, m) / energy_start - 1,
+        "velocity_kurtosis": velocity_kurtosis(v_x, v_y, m),
+        "mean_speed": np.mean(np.sqrt(v_x**2 + v_y**2)),
+        "collision_rate": n_collisions / (params["n_particles"] * params["t"]),
+    }
+    if neighbours is not None:
+        observables["list_rebuild_frequency"] = neighbours.rebuild_frequency
+    return observables
+
+
+def _run_task(index, run, params, seed_sequence, skin):
+    """helper for the process pool, returns the parameter set and run index with the observables"""
+    return index, run, run_simulation(params, seed_sequence, skin)
+
+
+def run_ensemble(parameter_sets, runs, seed=0, workers=None, skin=None):
+    """
+    Simulate each parameter set `runs` times on a process pool (with a Verlet neighbour list if
+    `skin` is given)
+
+    The seed of every single run only depends on `seed`, the index of the parameter set and the
+    index of the run, and the runs are aggregated in the order of their index (not in the order
+    in which they finish), so the results are reproducible independent of the number of workers.
+
+    Returns a list with a dictionary of `RunningStats` (one per observable) for each parameter set.
+    """
+    names = OBSERVABLES if skin is None else OBSERVABLES + ("list_rebuild_frequency",)
+    stats = [{name: RunningStats() for name in names} for _ in parameter_sets]
+    # finished runs that wait for the runs with a lower index: run index -> observables
+    pending = [{} for _ in parameter_sets]
+    next_run = [0 for _ in parameter_sets]  # index of the next run to aggregate
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _run_task, i, run, params, np.random.SeedSequence(seed, spawn_key=(i, run)), skin
+            )
+            for i, params in enumerate(parameter_sets)
+            for run in range(runs)
+        ]
+        for n_done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+            i, run, observables = future.result()
+            pending[i][run] = observables
+            while next_run[i] in pending[i]:
+                for name, value in pending[i].pop(next_run[i]).items():
+                    stats[i][name].push(value)
+                next_run[i] += 1
+            print(f"\r{n_done} / {len(futures)} simulations done", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    return stats
+
+
+def write_results(fname, parameter_sets, stats):
+    """write one row with the parameters and mean/std of all observables per parameter set"""
+    param_names = list(parameter_sets[0].keys())
+    fieldnames = param_names + ["runs"]
+    for name in stats[0]:
+        fieldnames += [f"{name}_mean", f"{name}_std"]
+    with open(fname, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for params, param_stats in zip(parameter_sets, stats):
+            row = dict(params, runs=param_stats[OBSERVABLES[0]].n)
+            for name, s in param_stats.items():
+                row[f"{name}_mean"] = s.mean
+                row[f"{name}_std"] = s.std
+            writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run ensembles of gas simulations for parameter sweeps."
+    )
+    parser.add_argument(
+        "--n-particles", help="numbers of particles in the box", type=int, nargs="+", default=[40]
+    )
+    parser.add_argument(
+        "--r",
+        help="maximal distances between particles for a collision to take place",
+        type=float,
+        nargs="+",
+        default=[0.03],
+    )
+    parser.add_argument(
+        "--collision-cool-down",
+        help="numbers of iterations a particle is not allowed to collide again after a collision",
+        type=int,
+        nargs="+",
+        default=[3],
+    )
+    parser.add_argument(
+        "--mass",
+        help="mass distributions: equal masses or random masses between 0.5 and 2.5",
+        choices=("equal", "random"),
+        nargs="+",
+        default=["equal"],
+    )
+    parser.add_argument("--t", help="the time that is simulated", type=float, default=100.0)
+    parser.add_argument("--delta-t", help="the timestep of the simulation", type=float, default=0.1)
+    parser.add_argument("--box-length", help="length of the box", type=float, default=1.0)
+    parser.add_argument(
+        "--runs", help="number of simulations per parameter set", type=int, default=8
+    )
+    parser.add_argument("--seed", help="base seed of the ensemble", type=int, default=0)
+    parser.add_argument(
+        "--workers", help="number of processes (default: all cores)", type=int, default=os.cpu_count()
+    )
+    parser.add_argument(
+        "--verlet-skin",
+        help="find the collisions with a Verlet neighbour list with this additional distance",
+        type=float,
+        default=None,
+    )
+    parser.add_argument("--output", help="csv file for the results", default="ensemble.csv")
+    args = parser.parse_args()
+
+    parameter_sets = [
+        {
+            "n_particles": n_particles,
+            "t": args.t,
+            "delta_t": args.delta_t,
+            "L": args.box_length,
+            "r": r,
+            "collision_cool_down": collision_cool_down,
+            "mass": mass,
+        }
+        for n_particles, r, collision_cool_down, mass in itertools.product(
+            args.n_particles, args.r, args.collision_cool_down, args.mass
+        )
+    ]
+    stats = run_ensemble(
+        parameter_sets, args.runs, seed=args.seed, workers=args.workers, skin=args.verlet_skin
+    )
+    write_results(args.output, parameter_sets, stats)
+    print("results written to", args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
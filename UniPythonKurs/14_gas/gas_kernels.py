@@ -0,0 +1,339 @@
+"""
+Compiled kernels for the gas simulation operating on flat arrays.
+
+The functions mirror the methods of `Particle` in gas_simulation_solution.py, but instead of one
+object per particle the state is stored in flat NumPy arrays (x, y, v_x, v_y, m, cool) with one
+entry per particle. If numba is available the kernels are compiled with `@njit`, otherwise the
+very same code runs as plain Python (slow, but with identical results).
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """fallback for `numba.njit` that returns the function unchanged"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
+
+
+def state_from_particles(particles):
+    """
+    Create the flat state arrays (x, y, v_x, v_y, m, cool) from a list of `Particle` objects
+    """
+    x = np.array([par.x for par in particles], dtype=np.float64)
+    y = np.array([par.y for par in particles], dtype=np.float64)
+    v_x = np.array([par.v_x for par in particles], dtype=np.float64)
+    v_y = np.array([par.v_y for par in particles], dtype=np.float64)
+    m = np.array([par.m for par in particles], dtype=np.float64)
+    cool = np.array([par.cool for par in particles], dtype=np.int64)
+    return x, y, v_x, v_y, m, cool
+
+
+def random_state(n_particles, L, rng=None, random_mass=False):
+    """
+    Create random flat state arrays in the same way as `simulate` does
+
+    n_particles -- number of particles in the box
+    L -- length of the box
+    rng -- numpy random Generator (or seed) to draw from, `np.random` is used if None
+    random_mass -- draw masses between 0.5 and 2.5 instead of using equal masses
+    """
+    if rng is None:
+        rng = np.random
+    elif not isinstance(rng, np.random.Generator):
+        rng = np.random.default_rng(rng)
+    pos = rng.random((n_particles, 2)) * L
+    vel = (rng.random((n_particles, 2)) - 0.5) / 5
+    if random_mass:
+        m = rng.random(n_particles) * 2 + 0.5
+    else:
+        m = np.ones(n_particles)
+    cool = np.zeros(n_particles, dtype=np.int64)
+    return (
+        np.ascontiguousarray(pos[:, 0]),
+        np.ascontiguousarray(pos[:, 1]),
+        np.ascontiguousarray(vel[:, 0]),
+        np.ascontiguousarray(vel[:, 1]),
+        m,
+        cool,
+    )
+
+
+@njit
+def move(x, y, v_x, v_y, delta_t):
+    """
+    move all particles for a specific time step without any collisions (`Particle.move`)
+
+    delta_t -- timestep
+    """
+    for i in range(x.shape[0]):
+        x[i] = x[i] + delta_t * v_x[i]
+        y[i] = y[i] + delta_t * v_y[i]
+
+
+@njit
+def apply_periodic_border(x, y, L):
+    """
+    Sets all particles back to the defined periodic box (`Particle.apply_periodic_border`)
+
+    L -- length of the box
+    """
+    for i in range(x.shape[0]):
+        while x[i] >= L:
+            x[i] = x[i] - L
+        while x[i] < 0:
+            x[i] = x[i] + L
+
+        while y[i] >= L:
+            y[i] = y[i] - L
+        while y[i] < 0:
+            y[i] = y[i] + L
+
+
+@njit
+def update_cool(cool):
+    """
+    update the cool fields, -> reduce by one if > 0 (`Particle.update_cool`)
+    """
+    for i in range(cool.shape[0]):
+        if cool[i] > 0:
+            cool[i] -= 1
+
+
+@njit
+def distance(x, y, i, j, L):
+    """
+    calculates the distance between particles i and j in the periodic box (`Particle.distance`)
+
+    L -- length of the box
+    """
+    delta_x = abs(x[i] - x[j])
+    if delta_x > L / 2:  # the way through the border is shorter
+        delta_x = L - delta_x
+
+    delta_y = abs(y[i] - y[j])
+    if delta_y > L / 2:  # the way through the border is shorter
+        delta_y = L - delta_y
+
+    return math.sqrt(delta_x**2 + delta_y**2)
+
+
+@njit
+def collision_speed_update(v_x, v_y, m, i, j):
+    """
+    Update the speeds of particles i and j after a collision (`Particle.collision_speed_update`)
+
+    Both speeds are calculated from the velocities before the collision.
+    """
+    v_x_i = (m[i] * v_x[i] + m[j] * (2 * v_x[j] - v_x[i])) / (m[i] + m[j])
+    v_y_i = (m[i] * v_y[i] + m[j] * (2 * v_y[j] - v_y[i])) / (m[i] + m[j])
+    v_x_j = (m[j] * v_x[j] + m[i] * (2 * v_x[i] - v_x[j])) / (m[j] + m[i])
+    v_y_j = (m[j] * v_y[j] + m[i] * (2 * v_y[i] - v_y[j])) / (m[j] + m[i])
+    v_x[i] = v_x_i
+    v_y[i] = v_y_i
+    v_x[j] = v_x_j
+    v_y[j] = v_y_j
+
+
+@njit
+def collide(x, y, v_x, v_y, m, cool, i, j, r, L, collision_cool_down):
+    """
+    Collide particles i and j if they are close enough (`Particle.collide`)
+
+    Returns True if the particles collided.
+    """
+    if cool[i] != 0 or cool[j] != 0:
+        return False
+    if distance(x, y, i, j, L) > r:
+        return False
+    collision_speed_update(v_x, v_y, m, i, j)
+    cool[i] = collision_cool_down + 1  # the + 1 is because the cool field is updated before the collision is evaluated
+    cool[j] = collision_cool_down + 1
+    return True
+
+
+@njit
+def collide_all(x, y, v_x, v_y, m, cool, r, L, collision_cool_down):
+    """
+    Collide all pairs of particles in the same order as `simulate` does
+
+    Returns the number of collisions.
+    """
+    n_collisions = 0
+    n = x.shape[0]
+    for j in range(n):
+        for k in range(j + 1, n):
+            # same checks as in `collide`, but inlined in the hot loop (cheap distance check first)
+            if distance(x, y, j, k, L) <= r and cool[j] == 0 and cool[k] == 0:
+                collision_speed_update(v_x, v_y, m, j, k)
+                cool[j] = collision_cool_down + 1
+                cool[k] = collision_cool_down + 1
+                n_collisions += 1
+    return n_collisions
+
+
+@njit
+def step(x, y, v_x, v_y, m, cool, delta_t, L, r, collision_cool_down):
+    """
+    Do one timestep of the simulation: move, apply the periodic border, cool down and collide
+
+    Returns the number of collisions.
+    """
+    move(x, y, v_x, v_y, delta_t)
+    apply_periodic_border(x, y, L)
+    update_cool(cool)
+    return collide_all(x, y, v_x, v_y, m, cool, r, L, collision_cool_down)
+
+
+@njit
+def max_displacement(x, y, x_ref, y_ref, L):
+    """largest distance of a particle from its reference position in the periodic box"""
+    result = 0.0
+    for i in range(x.shape[0]):
+        delta_x = abs(x[i] - x_ref[i])
+        if delta_x > L / 2:  # moved through the border
+            delta_x = L - delta_x
+        delta_y = abs(y[i] - y_ref[i])
+        if delta_y > L / 2:
+            delta_y = L - delta_y
+        result = max(result, math.sqrt(delta_x**2 + delta_y**2))
+    return result
+
+
+@njit
+def build_neighbour_list(x, y, L, cutoff):
+    """
+    Find all pairs of particles that are not further apart than `cutoff`
+
+    The candidates are taken from the 3x3 neighbouring cells of a cell list with cells of at least
+    `cutoff` length (all pairs are checked if the box is too small for 3 cells per direction).
+
+    Returns the pairs in compressed form: the partners j > i of particle i are
+    `partners[starts[i]:starts[i + 1]]` in ascending order, so iterating over i and then its
+    partners visits the pairs in the same order as `collide_all`.
+    """
+    n = x.shape[0]
+    n_cells = int(L // cutoff)
+    reach = 1  # neighbouring cells in each direction
+    if n_cells < 3:
+        # the neighbouring cells would overlap: one cell containing all particles
+        n_cells, reach = 1, 0
+
+    # sort the particles by cell
+    cell = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        cell_x = min(int(x[i] / L * n_cells), n_cells - 1)
+        cell_y = min(int(y[i] / L * n_cells), n_cells - 1)
+        cell[i] = cell_x * n_cells + cell_y
+    order = np.argsort(cell)
+    cell_starts = np.zeros(n_cells * n_cells + 1, dtype=np.int64)
+    for i in range(n):
+        cell_starts[cell[i] + 1] += 1
+    for c in range(n_cells * n_cells):
+        cell_starts[c + 1] += cell_starts[c]
+
+    starts = np.zeros(n + 1, dtype=np.int64)
+    partners = np.empty(max(16 * n, 1), dtype=np.int64)
+    candidates = np.empty(n, dtype=np.int64)
+    n_pairs = 0
+    for i in range(n):
+        n_candidates = 0
+        cell_x, cell_y = cell[i] // n_cells, cell[i] % n_cells
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                c = ((cell_x + dx) % n_cells) * n_cells + (cell_y + dy) % n_cells
+                for index in range(cell_starts[c], cell_starts[c + 1]):
+                    j = order[index]
+                    if j > i and distance(x, y, i, j, L) <= cutoff:
+                        candidates[n_candidates] = j
+                        n_candidates += 1
+        if n_pairs + n_candidates > partners.shape[0]:
+            grown = np.empty(2 * (n_pairs + n_candidates), dtype=np.int64)
+            grown[:n_pairs] = partners[:n_pairs]
+            partners = grown
+        partners[n_pairs:n_pairs + n_candidates] = np.sort(candidates[:n_candidates])
+        n_pairs += n_candidates
+        starts[i + 1] = n_pairs
+    return starts, partners[:n_pairs]
+
+
+@njit
+def collide_listed(x, y, v_x, v_y, m, cool, starts, partners, r, L, collision_cool_down):
+    """
+    Like `collide_all`, but only for the pairs of a neighbour list (see `build_neighbour_list`)
+
+    Returns the number of collisions.
+    """
+    n_collisions = 0
+    for j in range(x.shape[0]):
+        for index in range(starts[j], starts[j + 1]):
+            k = partners[index]
+            if distance(x, y, j, k, L) <= r and cool[j] == 0 and cool[k] == 0:
+                collision_speed_update(v_x, v_y, m, j, k)
+                cool[j] = collision_cool_down + 1
+                cool[k] = collision_cool_down + 1
+                n_collisions += 1
+    return n_collisions
+
+
+class VerletList:
+    """
+    Verlet neighbour list that is reused across timesteps
+
+    The list contains all pairs within r + skin. As long as no particle moved further than
+    skin / 2 since the list was built, every pair within r is still in the list, so the
+    collisions (and their order) are exactly the same as with `collide_all`. Otherwise the list
+    is rebuilt before colliding.
+
+    r -- maximal distance between particles for a collision to take place
+    skin -- additional distance for the pairs in the list
+    """
+
+    def __init__(self, r, skin):
+        self.r = r
+        self.skin = skin
+        self.n_builds = 0
+        self.n_steps = 0
+        self._x_ref = self._y_ref = None
+        self._starts = self._partners = None
+
+    @property
+    def rebuild_frequency(self):
+        """fraction of the steps in which the list was (re)built"""
+        return self.n_builds / self.n_steps if self.n_steps else 0.0
+
+    @property
+    def n_pairs(self):
+        """number of pairs in the current list"""
+        return 0 if self._partners is None else len(self._partners)
+
+    def update(self, x, y, L):
+        """rebuild the list if a particle moved more than skin / 2 since the last build"""
+        if self._x_ref is None or 2 * max_displacement(x, y, self._x_ref, self._y_ref, L) > self.skin:
+            self._starts, self._partners = build_neighbour_list(x, y, L, self.r + self.skin)
+            self._x_ref, self._y_ref = x.copy(), y.copy()
+            self.n_builds += 1
+
+    def step(self, x, y, v_x, v_y, m, cool, delta_t, L, collision_cool_down):
+        """
+        Do one timestep of the simulation like `step`, with the collisions from the list
+
+        Returns the number of collisions.
+        """
+        move(x, y, v_x, v_y, delta_t)
+        apply_periodic_border(x, y, L)
+        update_cool(cool)
+        self.update(x, y, L)
+        self.n_steps += 1
+        return collide_listed(
+            x, y, v_x, v_y, m, cool, self._starts, self._partners, self.r, L, collision_cool_down
+        )
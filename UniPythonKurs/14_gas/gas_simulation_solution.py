@@ -99,7 +99,26 @@ class Particle():
             other.cool = collision_cool_down + 1
 
 
-def simulate(n_particles, t, delta_t, L, r, collision_cool_down):
+def step(particles, delta_t, L, r, collision_cool_down):
+    """
+    Do one timestep of the simulation: move all particles and do all the collisions
+
+    particles -- list of all particles
+    delta_t -- the timestep of the simulation
+    L -- length of the box
+    r -- maximal distance between particles for a collision to take place
+    collision_cool_down -- number of iterations a particle is noty allowed to collide again after a collision
+    """
+    for par in particles:
+        par.move(delta_t)
+        par.apply_periodic_border(L)
+        par.update_cool()
+    for j in range(len(particles)):
+        for k in range(j + 1, len(particles)):
+            particles[j].collide(particles[k], r, L, collision_cool_down)
+
+
+def simulate(n_particles, t, delta_t, L, r, collision_cool_down, skin=None):
     """
     Simulate a gas (well we kicked out most of the physics so it is more a billard table) with a specific number of particles (atoms or molecules) in a periodic 2D box
 
@@ -109,6 +128,8 @@ def simulate(n_particles, t, delta_t, L, r, collision_cool_down):
     L -- length of the box
     r -- maximal distance between particles for a collision to take place
     collision_cool_down -- number of iterations a particle is noty allowed to collide again after a collision
+    skin -- if given, only check the pairs of a Verlet neighbour list with this additional distance for collisions
+            (see gas_kernels.VerletList, same results but much faster for many particles)
     """
     particles = []
     pos = np.random.random((n_particles, 2)) * L
@@ -120,24 +141,33 @@ def simulate(n_particles, t, delta_t, L, r, collision_cool_down):
         particles.append(Particle(pos[i, 0], pos[i, 1], vel[i, 0], vel[i, 1], mass[i]))
 
 
+    if skin is not None:
+        import gas_kernels  # only needed for the neighbour list, this file also works on its own
+
+        state = gas_kernels.state_from_particles(particles)
+        neighbours = gas_kernels.VerletList(r, skin)
+
     plt.ion()
     figure = plt.figure()
 
     for i in np.arange(0, t, delta_t):
-        for par in particles:
-            plt.plot(par.x, par.y, marker='o')
-            par.move(delta_t)
-            par.apply_periodic_border(L)
-            par.update_cool()
-        for j in range(len(particles)):
-            for k in range(j + 1, len(particles)):
-                particles[j].collide(particles[k], r, L, collision_cool_down)
+        if skin is None:
+            for par in particles:
+                plt.plot(par.x, par.y, marker='o')
+            step(particles, delta_t, L, r, collision_cool_down)
+        else:
+            for x, y in zip(state[0], state[1]):
+                plt.plot(x, y, marker='o')
+            neighbours.step(*state, delta_t, L, collision_cool_down)
         plt.xlim(0, L)
         plt.ylim(0, L)
         figure.canvas.draw()
         figure.canvas.flush_events()
         plt.clf()
 
+    if skin is not None:
+        print(f"neighbour list rebuilt in {neighbours.rebuild_frequency:.1%} of the steps")
+
 
 if __name__ == '__main__':
     N_Particles = 40  # number of particles
@@ -146,5 +176,6 @@ if __name__ == '__main__':
     Box_Length = 1  # length of the box
     R = 0.03  # maximal distance between particles for a collision to take place
     collision_cool_down = 3  # number of iterations a particle is noty allowed to collide again after a collision
+    Skin = None  # e.g. 0.05 to find the collisions with a Verlet neighbour list
 
-    simulate(N_Particles, T, Delta_T, Box_Length, R, collision_cool_down)
+    simulate(N_Particles, T, Delta_T, Box_Length, R, collision_cool_down, Skin)
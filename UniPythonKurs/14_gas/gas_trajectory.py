@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+
+"""
+Record trajectories of the gas simulation to disk and replay/analyse them.
+
+The trajectory file consists of a small header followed by the particle masses and a
+preallocated block of frames (x, y, v_x, v_y per particle) that is accessed via `np.memmap`.
+Frames are written step by step while simulating and read back without loading the full run
+into memory, so also very long runs can be kept and analysed.
+
+Usage examples:
+
+./gas_trajectory.py record run.gtraj --n-particles 1000 --t 1000
+./gas_trajectory.py stats run.gtraj --start 5000
+./gas_trajectory.py replay run.gtraj --start 100 --stop 200
+"""
+
+import argparse
+import json
+import struct
+import sys
+
+import numpy as np
+
+import gas_kernels
+
+
+MAGIC = b"GASTRAJ1"
+# magic, number of written frames, length of the json header
+_PREFIX = struct.Struct("<8sQQ")
+_ALIGNMENT = 64
+_DTYPE = np.dtype("<f8")
+# per particle and frame: x, y, v_x, v_y
+_N_FIELDS = 4
+
+
+def _data_offsets(n_particles, header_len):
+    """byte offsets of the masses and the frames in the file"""
+    masses_offset = -(-(_PREFIX.size + header_len) // _ALIGNMENT) * _ALIGNMENT
+    frames_offset = masses_offset + -(-n_particles * _DTYPE.itemsize // _ALIGNMENT) * _ALIGNMENT
+    return masses_offset, frames_offset
+
+
+class TrajectoryWriter:
+    """
+    Writes frames of a simulation into a preallocated memory mapped file
+
+    fname -- name of the trajectory file (will be overwritten)
+    n_frames -- maximal number of frames (the file is preallocated for this number)
+    m -- masses of the particles
+    L -- length of the box
+    delta_t -- time between two frames
+    """
+
+    def __init__(self, fname, n_frames, m, L, delta_t):
+        self.fname = fname
+        self.capacity = n_frames
+        self.n_frames = 0
+        n_particles = len(m)
+        header = json.dumps(
+            {"n_particles": n_particles, "capacity": n_frames, "L": L, "delta_t": delta_t}
+        ).encode()
+        masses_offset, frames_offset = _data_offsets(n_particles, len(header))
+
+        with open(fname, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, 0, len(header)))
+            f.write(header)
+            f.seek(masses_offset)
+            f.write(np.asarray(m, dtype=_DTYPE).tobytes())
+            # preallocate the frames
+            f.truncate(frames_offset + n_frames * n_particles * _N_FIELDS * _DTYPE.itemsize)
+
+        self._frames = np.memmap(
+            fname, dtype=_DTYPE, mode="r+", offset=frames_offset,
+            shape=(n_frames, n_particles, _N_FIELDS),
+        )
+
+    def append(self, x, y, v_x, v_y):
+        """append one frame with the current positions and velocities"""
+        if self.n_frames >= self.capacity:
+            raise ValueError(f"trajectory {self.fname} is full ({self.capacity} frames)")
+        frame = self._frames[self.n_frames]
+        frame[:, 0] = x
+        frame[:, 1] = y
+        frame[:, 2] = v_x
+        frame[:, 3] = v_y
+        self.n_frames += 1
+
+    def flush(self):
+        """write the frames to disk and update the number of frames in the header"""
+        self._frames.flush()
+        with open(self.fname, "r+b") as f:
+            f.seek(8)
+            f.write(struct.pack("<Q", self.n_frames))
+
+    def close(self):
+        self.flush()
+        del self._frames
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Trajectory:
+    """
+    Read-only access to a recorded trajectory
+
+    All frame accessors return views into the memory mapped file, so only the frames that are
+    actually used are read from disk.
+    """
+
+    def __init__(self, fname):
+        with open(fname, "rb") as f:
+            magic, n_frames, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{fname} is not a gas trajectory file")
+            header = json.loads(f.read(header_len))
+        self.n_frames = n_frames
+        self.n_particles = header["n_particles"]
+        self.L = header["L"]
+        self.delta_t = header["delta_t"]
+        masses_offset, frames_offset = _data_offsets(self.n_particles, header_len)
+        self.m = np.memmap(
+            fname, dtype=_DTYPE, mode="r", offset=masses_offset, shape=(self.n_particles,)
+        )
+        # only map the frames that were actually written
+        self._frames = np.memmap(
+            fname, dtype=_DTYPE, mode="r", offset=frames_offset,
+            shape=(max(n_frames, 1), self.n_particles, _N_FIELDS),
+        )[:n_frames]
+
+    def __len__(self):
+        return self.n_frames
+
+    def frames(self, start=0, stop=None, step=1):
+        """view of the frames [start:stop:step] with shape (frames, particles, (x, y, v_x, v_y))"""
+        return self._frames[start:stop:step]
+
+    def positions(self, start=0, stop=None, step=1):
+        """view of the positions with shape (frames, particles, (x, y))"""
+        return self._frames[start:stop:step, :, 0:2]
+
+    def velocities(self, start=0, stop=None, step=1):
+        """view of the velocities with shape (frames, particles, (v_x, v_y))"""
+        return self._frames[start:stop:step, :, 2:4]
+
+    def _chunks(self, start, stop, step, chunk_size):
+        """iterate over views of at most chunk_size frames each"""
+        # normalised like the slicing of the frames (also for negative indices and steps)
+        indices = range(self.n_frames)[start:stop:step]
+        for i in range(0, len(indices), chunk_size):
+            chunk = indices[i:i + chunk_size]
+            # a negative step ends with stop -1, which would mean the last frame in a slice
+            chunk_stop = chunk.stop if chunk.stop >= 0 else None
+            yield self._frames[chunk.start:chunk_stop:chunk.step]
+
+    def kinetic_energy(self, start=0, stop=None, step=1, chunk_size=1024):
+        """total kinetic energy for each frame in [start:stop:step]"""
+        energies = []
+        for chunk in self._chunks(start, stop, step, chunk_size):
+            energies.append(0.5 * np.sum(self.m * (chunk[:, :, 2]**2 + chunk[:, :, 3]**2), axis=1))
+        return np.concatenate(energies) if energies else np.zeros(0)
+
+    def speed_histogram(self, bins=50, start=0, stop=None, step=1, chunk_size=1024):
+        """
+        histogram of the speeds of all particles in the frames [start:stop:step]
+
+        Returns the counts and the bin edges like `np.histogram`.
+        """
+        v_max = 0.0
+        for chunk in self._chunks(start, stop, step, chunk_size):
+            v_max = max(v_max, np.sqrt(chunk[:, :, 2]**2 + chunk[:, :, 3]**2).max())
+        edges = np.linspace(0, v_max, bins + 1)
+        counts = np.zeros(bins, dtype=np.int64)
+        for chunk in self._chunks(start, stop, step, chunk_size):
+            counts += np.histogram(np.sqrt(chunk[:, :, 2]**2 + chunk[:, :, 3]**2), bins=edges)[0]
+        return counts, edges
+
+    def render(self, start=0, stop=None, step=1):
+        """replay the frames [start:stop:step] in the same way as `simulate` draws them"""
+        import matplotlib.pyplot as plt
+
+        plt.ion()
+        figure = plt.figure()
+        for frame in self.positions(start, stop, step):
+            plt.scatter(frame[:, 0], frame[:, 1], c=np.arange(self.n_particles) % 10, cmap="tab10")
+            plt.xlim(0, self.L)
+            plt.ylim(0, self.L)
+            figure.canvas.draw()
+            figure.canvas.flush_events()
+            plt.clf()
+
+
+def record(
+    fname, n_particles, t, delta_t, L, r, collision_cool_down, random_mass=False, seed=None, every=1,
+    flush_every=1000, neighbours=None,
+):
+    """
+    Simulate the gas with the array kernels and record every `every`-th step to `fname`
+
+    neighbours -- optional `gas_kernels.VerletList` (for `r`) to find the collisions with
+
+    The initial state is recorded as the first frame. Every `flush_every` frames the frames are
+    written to disk and the number of frames in the header is updated, so the frames recorded
+    so far can be read even if the run is interrupted.
+    """
+    x, y, v_x, v_y, m, cool = gas_kernels.random_state(
+        n_particles, L, np.random.default_rng(seed), random_mass=random_mass
+    )
+    n_steps = len(np.arange(0, t, delta_t))  # same number of steps as `simulate`
+    with TrajectoryWriter(fname, n_steps // every + 1, m, L, delta_t * every) as writer:
+        writer.append(x, y, v_x, v_y)
+        for i in range(1, n_steps + 1):
+            if neighbours is None:
+                gas_kernels.step(x, y, v_x, v_y, m, cool, delta_t, L, r, collision_cool_down)
+            else:
+                neighbours.step(x, y, v_x, v_y, m, cool, delta_t, L, collision_cool_down)
+            if i % every == 0:
+                writer.append(x, y, v_x, v_y)
+                if writer.n_frames % flush_every == 0:
+                    writer.flush()
+    return writer.n_frames
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Record and replay trajectories of the gas simulation."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="simulate and record a trajectory")
+    record_parser.add_argument("file", help="trajectory file to write")
+    record_parser.add_argument("--n-particles", help="number of particles in the box", type=int, default=40)
+    record_parser.add_argument("--t", help="the time that is simulated", type=float, default=100.0)
+    record_parser.add_argument("--delta-t", help="the timestep of the simulation", type=float, default=0.1)
+    record_parser.add_argument("--box-length", help="length of the box", type=float, default=1.0)
+    record_parser.add_argument(
+        "--r", help="maximal distance between particles for a collision to take place", type=float, default=0.03
+    )
+    record_parser.add_argument(
+        "--collision-cool-down",
+        help="number of iterations a particle is not allowed to collide again after a collision",
+        type=int,
+        default=3,
+    )
+    record_parser.add_argument("--random-mass", help="use random masses", action="store_true")
+    record_parser.add_argument("--seed", help="seed for the initial state", type=int, default=None)
+    record_parser.add_argument("--every", help="record only every n-th step", type=int, default=1)
+    record_parser.add_argument(
+        "--verlet-skin",
+        help="find the collisions with a Verlet neighbour list with this additional distance",
+        type=float,
+        default=None,
+    )
+    record_parser.add_argument(
+        "--flush-every", help="write the recorded frames to disk every n frames", type=int, default=1000
+    )
+
+    for command, description in (("replay", "draw the recorded frames"), ("stats", "print statistics of the recorded frames")):
+        sub = subparsers.add_parser(command, help=description)
+        sub.add_argument("file", help="trajectory file to read")
+        sub.add_argument("--start", help="first frame", type=int, default=0)
+        sub.add_argument("--stop", help="stop before this frame", type=int, default=None)
+        sub.add_argument("--step", help="use only every n-th frame", type=int, default=1)
+    args = parser.parse_args()
+    if args.command != "record" and args.step < 1:
+        parser.error("--step has to be positive")
+
+    if args.command == "record":
+        neighbours = None if args.verlet_skin is None else gas_kernels.VerletList(args.r, args.verlet_skin)
+        n_frames = record(
+            args.file, args.n_particles, args.t, args.delta_t, args.box_length, args.r,
+            args.collision_cool_down, random_mass=args.random_mass, seed=args.seed, every=args.every,
+            flush_every=args.flush_every, neighbours=neighbours,
+        )
+        print(f"recorded {n_frames} frames to {args.file}")
+        if neighbours is not None:
+            print(f"neighbour list rebuilt in {neighbours.rebuild_frequency:.1%} of the steps")
+        return 0
+
+    trajectory = Trajectory(args.file)
+    if args.command == "replay":
+        trajectory.render(args.start, args.stop, args.step)
+    else:  # stats
+        energy = trajectory.kinetic_energy(args.start, args.stop, args.step)
+        if len(energy) == 0:
+            parser.error(
+                f"no frames in [{args.start}:{args.stop}:{args.step}] of the {len(trajectory)} recorded frames"
+            )
+        counts, edges = trajectory.speed_histogram(20, args.start, args.stop, args.step)
+        print(f"{len(trajectory)} frames of {trajectory.n_particles} particles, delta_t = {trajectory.delta_t}")
+        print(f"kinetic energy: first {energy[0]:.6g}, last {energy[-1]:.6g}, max relative deviation "
+              f"{np.max(np.abs(energy / energy[0] - 1)):.3g}")
+        print("speed histogram:")
+        for count, low, high in zip(counts, edges[:-1], edges[1:]):
+            print(f"  {low:.4f} - {high:.4f}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,7 @@
 const { readdirSync, readFileSync, existsSync, writeFileSync } = require("fs");
 const { join, basename } = require("path");
 const { log, error } = require("console");
+const { createHash } = require("crypto");
 
 
 /**
@@ -32,6 +33,15 @@ const getNotebooks = deployDir => {
     return notebooks;
 };
 
+/**
+ * Helper to read the manifest written by process_nb.py --deploy, null if there is none.
+ */
+const getManifest = deployDir => {
+    const manifestPath = join(deployDir, "manifest.json");
+    if (!existsSync(manifestPath)) return null;
+    return JSON.parse(readFileSync(manifestPath, "utf8"));
+};
+
 /**
  * Obfuscation helpers
  */
@@ -80,6 +90,53 @@ const provideNotebook = notebookPath => {
     log(`created '${outputPath}'`);
 }
 
+/**
+ * Helper to provide a notebook listed in the manifest.
+ */
+
+const provideManifestNotebook = (deployDir, entry) => {
+    // determine the output path
+    const outputPath = join(process.cwd(), entry.file) + ".ipynb";
+
+    // the file should not exist already
+    if (existsSync(outputPath)) {
+        throw new Error(`output path '${outputPath}' already exists`);
+    }
+
+    // read the file content and check that it belongs to the manifest
+    // (it might have been replaced by a new deployment in the meantime)
+    const encoded = readFileSync(join(deployDir, entry.file), "utf8");
+    const content = Buffer.from(encoded, "base64");
+    if (encoded.length !== entry.size || createHash("sha256").update(content).digest("hex") !== entry.sha256) {
+        throw new Error("notebook is currently being updated, please try again");
+    }
+
+    // replace the placeholders at their byte offsets with the username (plain and base64 encoded)
+    const un = process.env.USER;
+    const replacements = {};
+    replacements[dec("RFVNTVlVU0VS")] = Buffer.from(un, "utf8");
+    replacements[dec("RFVNTVk2NFVTRVI=")] = Buffer.from(enc(un), "utf8");
+    const splices = [];
+    for (const [placeholder, offsets] of Object.entries(entry.offsets)) {
+        for (const offset of offsets) {
+            splices.push([offset, placeholder.length, replacements[placeholder]]);
+        }
+    }
+    splices.sort((a, b) => a[0] - b[0]);
+
+    const parts = [];
+    let position = 0;
+    for (const [offset, length, replacement] of splices) {
+        parts.push(content.subarray(position, offset), replacement);
+        position = offset + length;
+    }
+    parts.push(content.subarray(position));
+
+    // write the content to the output file
+    writeFileSync(outputPath, Buffer.concat(parts));
+    log(`created '${outputPath}'`);
+}
+
 
 /**
  * Main.
@@ -88,7 +145,10 @@ const provideNotebook = notebookPath => {
 const main = async () => {
     // get notebooks
     const deployDir = dec("L2Fmcy9waHlzbmV0LnVuaS1oYW1idXJnLmRlL3VzZXJzL2V4X2JhL21yaWVnZXIvcHVibGljLy5weXRob24tc3MyNS1zZW1lc3Rlci1kZXBsb3ltZW50");
-    const notebooks = getNotebooks(deployDir);
+    // a single lookup in the manifest, the directory is only scanned for notebooks that are not
+    // listed in it (e.g. added later with cpp/encode) or for deployments without a manifest
+    const manifest = getManifest(deployDir);
+    const manifestNotebooks = manifest === null ? {} : manifest.notebooks;
 
     // get arguments
     const args = process.argv.slice(2);
@@ -98,20 +158,26 @@ const main = async () => {
 
     // print notebooks if there are no arguments
     if (args.length === 0) {
+        const shortNames = new Set([...Object.keys(getNotebooks(deployDir)), ...Object.keys(manifestNotebooks)]);
         log("available notebooks:");
-        for (const shortName of Object.keys(notebooks).sort()) {
+        for (const shortName of [...shortNames].sort()) {
             log(shortName);
         }
         return 0;
     }
 
-    // provide the notebook if it exists
+    // provide the notebook from the manifest if it is listed there
     const shortName = args[0];
+    if (shortName in manifestNotebooks) {
+        provideManifestNotebook(deployDir, manifestNotebooks[shortName]);
+        return 0;
+    }
+
+    // otherwise provide it from the directory if it exists
+    const notebooks = getNotebooks(deployDir);
     if (!(shortName in notebooks)) {
         throw new Error(`notebook '${shortName}' unknown`);
     }
-
-    // provide the notebook
     provideNotebook(notebooks[shortName]);
 
     return 0;
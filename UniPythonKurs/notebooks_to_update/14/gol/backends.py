@@ -0,0 +1,105 @@
+"""
+Collection of the available board implementations ("backends") for GoL
+
+All backends provide the same interface as `Board`: `board[row, col]`, `print`,
+`update_board`, `initialize_randomly`, `insert_blinker` and `insert_glider`.
+"""
+
+import numpy as np
+
+from bit_board import BitBoard
+from board import Board
+from hashlife_board import HashlifeBoard
+from numpy_board import NumpyBoard
+from parallel_board import ParallelBoard
+from random_soup import random_cells
+from sparse_board import SparseBoard
+
+BACKENDS = {
+    "cells": Board,
+    "numpy": NumpyBoard,
+    "sparse": SparseBoard,
+    "hashlife": HashlifeBoard,
+    "bits": BitBoard,
+    "parallel": ParallelBoard,
+}
+
+# backends that support unbounded boards (size 0)
+UNBOUNDED_BACKENDS = {"sparse", "hashlife"}
+
+
+def make_board(backend, size, **options):
+    """
+    create an empty board of the given backend name and size (0 for an unbounded board)
+
+    Additional options are passed to the backend (e.g. `workers` for the parallel
+    backend).
+    """
+    if size == 0:
+        if backend not in UNBOUNDED_BACKENDS:
+            raise ValueError(f"backend {backend} does not support unbounded boards")
+        return BACKENDS[backend](None, **options)
+    return BACKENDS[backend](size, **options)
+
+
+def advance(board, generations):
+    """
+    advance the board by the given number of generations (in one call if the backend
+    supports it)
+    """
+    if hasattr(board, "advance"):
+        board.advance(generations)
+        return
+    for _ in range(generations):
+        board.update_board()
+
+
+def board_array(board):
+    """
+    return a boolean array with the alive states of the board (also for the `Board` of
+    cells)
+    """
+    if hasattr(board, "as_array"):
+        return board.as_array()
+    return np.array(
+        [
+            [board[row, col].is_alive() for col in range(board.size)]
+            for row in range(board.size)
+        ],
+        dtype=bool,
+    ).reshape(board.size, board.size)
+
+
+def load_cells(board, cells):
+    """
+    set the alive states of the board from a boolean array, placed in the top left
+    corner
+
+    Cells that do not fit on a bounded board are cut off, all other cells of the board
+    are dead.
+    """
+    cells = np.asarray(cells, dtype=bool)
+    if board.size is not None:
+        full = np.zeros((board.size, board.size), dtype=bool)
+        rows, cols = min(board.size, cells.shape[0]), min(board.size, cells.shape[1])
+        full[:rows, :cols] = cells[:rows, :cols]
+        cells = full
+    if hasattr(board, "load_array"):
+        board.load_array(cells)
+        return
+    for row, alive_states in enumerate(cells.tolist()):
+        for col, alive in enumerate(alive_states):
+            board[row, col].alive = alive
+
+
+def initialize_randomly(board, alive_probability, seed=None):
+    """
+    set the cells of any backend alive with `alive_probability` and dead otherwise
+
+    The same seed gives the same initial state for all backends. The cells of a `Board`
+    are drawn at once and then set, instead of calling `random.random()` for every cell.
+    """
+    if hasattr(board, "load_array"):
+        board.initialize_randomly(alive_probability, seed=seed)
+        return
+    load_cells(board, random_cells(board.size, board.size, alive_probability, seed))
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+
+"""
+Check and benchmark all board backends of GoL.
+
+First every backend is compared with the reference `Board` (consisting of `Cell`
+objects) on known patterns: the period of a blinker, the displacement of a glider and
+random soups. The hashlife backend lives on an unbounded plane and is therefore only
+checked on patterns that stay away from the edges of the board. Afterwards
+generations/second, the memory of the board itself and the peak memory during two
+generations are measured per cell for each backend and board size (the temporary buffers
+of the random initialisation are not included).
+
+Usage examples:
+
+./benchmark.py
+./benchmark.py --backends numpy bits --sizes 1024 4096 --min-time 5
+./benchmark.py --check-only
+"""
+
+import argparse
+import csv
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from backends import (
+    BACKENDS,
+    UNBOUNDED_BACKENDS,
+    advance,
+    board_array,
+    initialize_randomly,
+    make_board,
+)
+from board import Board
+
+# largest board size that is benchmarked by default for each backend
+MAX_SIZES = {
+    "cells": 256,
+    "numpy": 8192,
+    "sparse": 512,
+    "hashlife": 256,
+    "bits": 16384,
+    "parallel": 16384,
+}
+# backends whose cells outside of the board stay alive
+UNBOUNDED_PLANE = {"hashlife"}
+
+
+def close(board):
+    """stop the worker processes of a board (if it has any)"""
+    if hasattr(board, "close"):
+        board.close()
+
+
+def check_against_reference(backend, initialize, size, generations):
+    """
+    run the backend and the reference `Board` side by side, returns the first generation
+    that differs or None if all agree
+    """
+    reference = Board(size)
+    board = make_board(backend, size)
+    try:
+        initialize(reference)
+        initialize(board)
+        for generation in range(generations + 1):
+            if not (board_array(board) == board_array(reference)).all():
+                return generation
+            reference.update_board()
+            advance(board, 1)
+    finally:
+        close(board)
+    return None
+
+
+def check_blinker(backend):
+    """the blinker has period 2 and agrees with the reference"""
+    board = make_board(backend, 10)
+    try:
+        board.insert_blinker(4, 5)
+        states = [board_array(board)]
+        for _ in range(4):
+            advance(board, 1)
+            states.append(board_array(board))
+    finally:
+        close(board)
+    period_2 = all((states[i] == states[i + 2]).all() for i in range(3))
+    oscillates = not (states[0] == states[1]).all()
+    mismatch = check_against_reference(backend, lambda b: b.insert_blinker(4, 5), 10, 4)
+    return period_2 and oscillates and mismatch is None
+
+
+def check_glider(backend):
+    """the glider moves by one cell diagonally every 4 generations"""
+    board = make_board(backend, 20)
+    try:
+        board.insert_glider(2, 3)
+        start = board_array(board)
+        advance(board, 20)
+        expected = np.zeros_like(start)
+        expected[5:, 5:] = start[:-5, :-5]
+        moved = (board_array(board) == expected).all()
+    finally:
+        close(board)
+    mismatch = check_against_reference(backend, lambda b: b.insert_glider(2, 3), 20, 20)
+    return moved and mismatch is None
+
+
+def check_unbounded_glider(backend):
+    """
+    the glider moves by 10 cells diagonally within 40 generations on an unbounded board
+    """
+    board = make_board(backend, 0)
+    board.insert_glider(-3, -5)
+    start = [
+        (row, col)
+        for row in range(-6, 0)
+        for col in range(-8, 0)
+        if board[row, col].is_alive()
+    ]
+    advance(board, 40)
+    moved = all(board[row + 10, col + 10].is_alive() for row, col in start)
+    return moved and board_array(board).sum() == len(start)
+
+
+def check_soups(backend, sizes, generations, seed):
+    """random soups filling the whole board (including the behaviour at the edges)"""
+    for size in sizes:
+        for i in range(3):
+            soup_seed = (seed, size, i)
+            mismatch = check_against_reference(
+                backend,
+                lambda b: initialize_randomly(b, 0.4, soup_seed),
+                size,
+                generations,
+            )
+            if mismatch is not None:
+                return f"size {size}, soup {i}, generation {mismatch}"
+    return None
+
+
+def check_padded_soups(backend, sizes, generations, seed):
+    """random soups with a dead margin that can not be reached within the generations"""
+    margin = generations + 1
+    for size in sizes:
+        for i in range(3):
+            soup = np.random.default_rng((seed, size, i)).random((size, size)) < 0.4
+
+            def initialize(b):
+                for row, col in zip(*np.nonzero(soup)):
+                    b[int(row) + margin, int(col) + margin].set_alive()
+
+            mismatch = check_against_reference(
+                backend, initialize, size + 2 * margin, generations
+            )
+            if mismatch is not None:
+                return f"size {size}, soup {i}, generation {mismatch}"
+    return None
+
+
+def check_backends(backends, args):
+    """check all backends against the reference, returns True if all agree"""
+    all_ok = True
+    for backend in backends:
+        results = {
+            "blinker": check_blinker(backend),
+            "glider": check_glider(backend),
+        }
+        if backend in UNBOUNDED_BACKENDS:
+            results["unbounded glider"] = check_unbounded_glider(backend)
+        failure = check_padded_soups(
+            backend, args.check_sizes, args.check_generations, args.seed
+        )
+        results["soups"] = failure is None
+        if backend not in UNBOUNDED_PLANE:
+            failure = failure or check_soups(
+                backend, args.check_sizes, args.check_generations, args.seed
+            )
+            results["soups at the edges"] = failure is None
+        ok = all(results.values())
+        all_ok &= ok
+        summary = ", ".join(
+            f"{name} {'ok' if passed else 'MISMATCH'}"
+            for name, passed in results.items()
+        )
+        print(f"{backend:>10}: {summary}" + (f" ({failure})" if failure else ""))
+    return all_ok
+
+
+def measure(backend, size, args):
+    """
+    returns generations/second, the memory of the board and the peak memory while it
+    advances by two generations (both per cell in bytes)
+    """
+    # timing (the first generation is not timed, it may start worker processes)
+    board = make_board(backend, size)
+    try:
+        initialize_randomly(board, args.alive_probability, args.seed)
+        advance(board, 1)
+        n_generations = 0
+        start = time.perf_counter()
+        while (
+            n_generations < args.min_generations
+            or time.perf_counter() - start < args.min_time
+        ):
+            advance(board, 1)
+            n_generations += 1
+        generations_per_second = n_generations / (time.perf_counter() - start)
+    finally:
+        close(board)
+    del board
+
+    # memory (separate run, tracing slows down the execution)
+    tracemalloc.start()
+    board = make_board(backend, size)
+    try:
+        initialize_randomly(board, args.alive_probability, args.seed)
+        # the arrays of the board, without the freed buffers of the initialisation
+        board_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        advance(board, 1)
+        advance(board, 1)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        close(board)
+    return generations_per_second, board_memory / size**2, peak_memory / size**2
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check and benchmark the GoL board backends."
+    )
+    parser.add_argument(
+        "--backends",
+        help="backends to check and benchmark",
+        nargs="+",
+        choices=list(BACKENDS),
+        default=list(BACKENDS),
+    )
+    parser.add_argument(
+        "--sizes",
+        help="board sizes (square)",
+        type=int,
+        nargs="+",
+        default=[64, 256, 1024, 4096],
+    )
+    parser.add_argument(
+        "--no-limits",
+        help="also run backends for boards larger than they can handle in reasonable "
+        "time",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--alive-probability",
+        help="probability of a cell to be alive initially",
+        type=float,
+        default=0.3,
+    )
+    parser.add_argument("--seed", help="seed for the random soups", type=int, default=0)
+    parser.add_argument(
+        "--min-time",
+        help="minimal time (in seconds) per measurement",
+        type=float,
+        default=1.0,
+    )
+    parser.add_argument(
+        "--min-generations",
+        help="minimal number of generations per measurement",
+        type=int,
+        default=3,
+    )
+    parser.add_argument(
+        "--check-sizes",
+        help="board sizes of the random soups for the correctness check",
+        type=int,
+        nargs="+",
+        default=[1, 2, 5, 17, 64, 65],
+    )
+    parser.add_argument(
+        "--check-generations",
+        help="number of generations for the correctness check",
+        type=int,
+        default=8,
+    )
+    parser.add_argument(
+        "--check-only", help="only run the correctness check", action="store_true"
+    )
+    parser.add_argument(
+        "--csv", help="also write the results to this csv file", default=None
+    )
+    args = parser.parse_args()
+
+    print("correctness check against the reference Board:")
+    all_ok = check_backends(args.backends, args)
+    print()
+    if args.check_only:
+        return 0 if all_ok else 1
+
+    results = []
+    print(
+        f"{'backend':>10} {'size':>8} {'generations/s':>14} "
+        f"{'board/cell':>12} {'peak/cell':>12}"
+    )
+    for backend in args.backends:
+        for size in args.sizes:
+            if size > MAX_SIZES[backend] and not args.no_limits:
+                print(f"{backend:>10} {size:>8} {'skipped':>14}")
+                continue
+            generations_per_second, board_per_cell, peak_per_cell = measure(
+                backend, size, args
+            )
+            results.append(
+                (backend, size, generations_per_second, board_per_cell, peak_per_cell)
+            )
+            print(
+                f"{backend:>10} {size:>8} {generations_per_second:>14.4g} "
+                f"{board_per_cell:>10.3g} B {peak_per_cell:>10.3g} B"
+            )
+    if "parallel" in args.backends:
+        print(
+            "(the memory of the parallel backend does not include its shared "
+            "memory and workers)"
+        )
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(
+                (
+                    "backend",
+                    "size",
+                    "generations_per_second",
+                    "board_memory_per_cell_bytes",
+                    "peak_memory_per_cell_bytes",
+                )
+            )
+            writer.writerows(results)
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
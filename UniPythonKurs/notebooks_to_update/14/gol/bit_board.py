@@ -0,0 +1,164 @@
+"""
+Implementation of a bit-packed 2D board for GoL
+
+Every row of the board is stored as 64 bit integers (NumPy uint64), each bit is one
+cell: column `col` is bit `col % 64` of word `col // 64`. So one cell only needs one bit
+and the neighbour counts are calculated with bitwise adders for 64 cells per operation.
+"""
+
+import numpy as np
+
+from board import Board
+from cell import CellView
+from random_soup import random_chunks
+
+_ONE = np.uint64(1)
+_63 = np.uint64(63)
+
+
+def pack(cells):
+    """pack a boolean array (rows, cols) into an uint64 array (rows, ceil(cols / 64))"""
+    rows, cols = cells.shape
+    n_words = -(-cols // 64)
+    padded = np.zeros((rows, n_words * 64), dtype=bool)
+    padded[:, :cols] = cells
+    return np.packbits(padded, axis=1, bitorder="little").view("<u8").astype(np.uint64)
+
+
+def unpack(words, cols):
+    """
+    unpack an uint64 array created by `pack` into a boolean array with `cols` columns
+    """
+    as_bytes = np.ascontiguousarray(words, dtype="<u8").view(np.uint8)
+    return np.unpackbits(as_bytes, axis=1, count=cols, bitorder="little").astype(bool)
+
+
+def _full_adder(a, b, c):
+    """bitwise a + b + c, returns the sum and carry bits"""
+    a_xor_b = a ^ b
+    return a_xor_b ^ c, (a & b) | (c & a_xor_b)
+
+
+def _west(words):
+    """for every cell the state of its left neighbour (col - 1)"""
+    shifted = words << _ONE
+    shifted[:, 1:] |= words[:, :-1] >> _63
+    return shifted
+
+
+def _east(words):
+    """for every cell the state of its right neighbour (col + 1)"""
+    shifted = words >> _ONE
+    shifted[:, :-1] |= words[:, 1:] << _63
+    return shifted
+
+
+def next_generation(words, last_word_mask):
+    """
+    calculate the next generation of the packed board `words`
+
+    Cells outside of the board count as dead, `last_word_mask` marks the bits of the
+    last word of each row that belong to the board.
+    """
+    north = np.zeros_like(words)
+    north[1:] = words[:-1]
+    south = np.zeros_like(words)
+    south[:-1] = words[1:]
+
+    # add the 8 neighbours bitwise: the count (modulo 8) is stored in the bits s0, s1
+    # and s2
+    sum_a, carry_a = _full_adder(north, south, _west(words))
+    sum_b, carry_b = _full_adder(_east(words), _west(north), _east(north))
+    sum_c, carry_c = _west(south) ^ _east(south), _west(south) & _east(south)
+    s0, carry_d = _full_adder(sum_a, sum_b, sum_c)
+    sum_e, carry_e = _full_adder(carry_a, carry_b, carry_c)
+    s1 = sum_e ^ carry_d
+    s2 = carry_e ^ (sum_e & carry_d)
+
+    # alive with 3 neighbours or with 2 if alive already (8 neighbours give 0)
+    new = s1 & ~s2 & (s0 | words)
+    new[:, -1] &= last_word_mask
+    return new
+
+
+class BitBoard(Board):
+    def __init__(self, size):
+        self.size = size
+        self.n_words = -(-size // 64)
+        # alive states of all cells, 64 per word
+        self.words = np.zeros((size, self.n_words), dtype=np.uint64)
+        n_bits_last = size - 64 * (self.n_words - 1)
+        self.last_word_mask = np.uint64(2**n_bits_last - 1)
+        # words before the last update (every update creates a new array, so this is not
+        # a copy), the flipped cells are only determined when they are asked for
+        self._previous_words = None
+
+    def __getitem__(self, rowcol):
+        """allows you to access a cell of a board object with `board[row, col]`"""
+        row, col = rowcol
+        if not (-self.size <= row < self.size and -self.size <= col < self.size):
+            raise IndexError(f"cell ({row}, {col}) is not on the board")
+        return CellView(self, row % self.size, col % self.size)
+
+    def is_cell_alive(self, row, col):
+        return bool((self.words[row, col // 64] >> np.uint64(col % 64)) & _ONE)
+
+    def set_cell(self, row, col, alive=True):
+        bit = _ONE << np.uint64(col % 64)
+        if alive:
+            self.words[row, col // 64] |= bit
+        else:
+            self.words[row, col // 64] &= ~bit
+
+    def as_array(self):
+        """return a boolean array with the alive states of all cells"""
+        return unpack(self.words, self.size)
+
+    def load_array(self, cells):
+        """set the alive states of all cells from a boolean array"""
+        self.words = pack(np.asarray(cells, dtype=bool))
+
+    def print(self):
+        # build the full output first and print it at once
+        chars = np.where(self.as_array(), "o ", "  ")
+        print("\n".join("".join(row) for row in chars) + "\n")
+
+    def count_alive_neighbours(self, row, col):
+        """count the number of alive neighbours of this cell"""
+        return sum(
+            self.is_cell_alive(row + dr, col + dc)
+            for dr in range(-1, 2)
+            for dc in range(-1, 2)
+            if not dr == dc == 0
+            and 0 <= row + dr < self.size
+            and 0 <= col + dc < self.size
+        )
+
+    def changed_cells(self):
+        """
+        return the row and column indices of the cells that flipped during the last
+        update
+        """
+        if self._previous_words is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        flipped = self._previous_words ^ self.words
+        # only the words that contain flipped cells are unpacked
+        rows, word_cols = np.nonzero(flipped)
+        as_bytes = flipped[rows, word_cols].astype("<u8").view(np.uint8).reshape(-1, 8)
+        index, bits = np.nonzero(np.unpackbits(as_bytes, axis=1, bitorder="little"))
+        return rows[index], word_cols[index] * 64 + bits
+
+    def update_board(self):
+        """calculate the new generation status und update THIS board"""
+        self._previous_words = self.words
+        self.words = next_generation(self.words, self.last_word_mask)
+
+    def initialize_randomly(self, alive_probability, seed=None):
+        """
+        set cells alive with `alive_probability` (between 0 and 1) and dead otherwise
+        """
+        # pack chunk by chunk, the full boolean array is never needed
+        for row_start, chunk in random_chunks(
+            self.size, self.size, alive_probability, seed
+        ):
+            self.words[row_start : row_start + len(chunk)] = pack(chunk)
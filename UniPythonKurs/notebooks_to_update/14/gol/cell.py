@@ -27,3 +27,25 @@ class Cell:
         if self.is_alive():
             return "o"
         return " "
+
+
+class CellView(Cell):
+    """
+    A `Cell` that does not store its alive state itself, but reads and writes it from/to
+    a board which stores the states of all cells in an array (e.g. `NumpyBoard`)
+    """
+
+    def __init__(self, board, row, col):
+        self.board = board
+        self.row = row
+        self.col = col
+
+    @property
+    def alive(self):
+        # read the alive state from the board
+        return self.board.is_cell_alive(self.row, self.col)
+
+    @alive.setter
+    def alive(self, alive):
+        # write the alive state to the board
+        self.board.set_cell(self.row, self.col, alive)
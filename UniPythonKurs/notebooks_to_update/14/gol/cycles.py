@@ -0,0 +1,123 @@
+"""
+Detection of still lifes and cycles in GoL with Zobrist hashing
+
+Every cell gets a pseudo random 64 bit key and the hash of a board is the XOR of the
+keys of all alive cells. When cells flip, the hash is updated by XORing only their keys,
+so hashing a generation costs time proportional to the number of changed cells. The keys
+are calculated from the coordinates (splitmix64) instead of being stored in a table, so
+they also exist for unbounded boards.
+
+A board state that appeared before means that the board is in a cycle (a still life is a
+cycle with period 1). Different states with the same hash are possible, but very
+unlikely.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from backends import board_array
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_LOW_32 = np.uint64(0xFFFFFFFF)
+
+
+def cell_keys(rows, cols):
+    """
+    the pseudo random 64 bit keys of the cells (rows[i], cols[i]) (splitmix64 of the
+    coordinates)
+    """
+    rows = np.asarray(rows, dtype=np.int64).astype(np.uint64)
+    cols = np.asarray(cols, dtype=np.int64).astype(np.uint64)
+    z = ((rows << np.uint64(32)) | (cols & _LOW_32)) + _GOLDEN_GAMMA
+    z = (z ^ (z >> np.uint64(30))) * _MIX_1
+    z = (z ^ (z >> np.uint64(27))) * _MIX_2
+    return z ^ (z >> np.uint64(31))
+
+
+def hash_cells(rows, cols):
+    """XOR of the keys of the given cells"""
+    return int(np.bitwise_xor.reduce(cell_keys(rows, cols)))
+
+
+def _split(cells):
+    """
+    split a collection of (row, col) tuples into an array of rows and an array of cols
+    """
+    if not cells:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    rows, cols = zip(*cells)
+    return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+
+class CycleDetector:
+    """
+    Remembers the hashes of the last generations to find repeated board states
+
+    history -- maximal number of generations that are remembered, cycles with a longer
+               period are not detected
+    """
+
+    def __init__(self, history=1024):
+        self.history = history
+        # hash of the current board state
+        self.hash = 0
+        # generation at which each remembered hash was recorded, and the recording order
+        self._generations = {}
+        self._order = deque()
+
+    def reset(self, rows, cols):
+        """set the hash to the state with the given alive cells"""
+        self.hash = hash_cells(rows, cols)
+
+    def flip(self, rows, cols):
+        """update the hash for the given cells that changed their state"""
+        self.hash ^= hash_cells(rows, cols)
+
+    def record(self, generation):
+        """
+        remember the current hash for the given generation
+
+        Returns (onset, period) if the state appeared before: the board is in a cycle of
+        `period` generations since generation `onset`. Returns None otherwise.
+        """
+        onset = self._generations.get(self.hash)
+        if onset is not None:
+            return onset, generation - onset
+        self._generations[self.hash] = generation
+        self._order.append(self.hash)
+        if len(self._order) > self.history:
+            del self._generations[self._order.popleft()]
+        return None
+
+
+class BoardCycleDetector(CycleDetector):
+    """
+    CycleDetector following the states of a board (of any backend)
+
+    Call `update` after every generation of the board. Only the cells that flipped
+    during the update are hashed if the backend reports them with `changed_cells`
+    (numpy, parallel, sparse and bits), other backends are hashed completely.
+    """
+
+    def __init__(self, board, history=1024):
+        super().__init__(history)
+        self.board = board
+        self.reset(*self._alive_cells())
+
+    def _alive_cells(self):
+        """(rows, cols) of all alive cells of the board"""
+        alive_cells = getattr(self.board, "alive_cells", None)
+        if alive_cells is None:
+            return np.nonzero(board_array(self.board))
+        return _split(alive_cells() if callable(alive_cells) else alive_cells)
+
+    def update(self):
+        """update the hash after the board advanced by one generation"""
+        changed_cells = getattr(self.board, "changed_cells", None)
+        if changed_cells is not None:
+            self.flip(*changed_cells())
+        else:
+            self.reset(*self._alive_cells())
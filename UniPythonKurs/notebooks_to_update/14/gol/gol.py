@@ -8,6 +8,18 @@ Usage examples:
 ./gol.py --insert-blinker 4 5
 ./gol.py --insert-glider 2 3 --update-interval .1
 ./gol.py --init-random .3
+./gol.py --init-random .3 --size 200 --backend numpy
+./gol.py --init-random .3 --seed 42 --size 200 --backend bits
+./gol.py --insert-glider 2 3 --size 0 --backend sparse
+./gol.py --insert-glider 2 3 --size 0 --backend hashlife --jump 10
+./gol.py --init-random .3 --size 2000 --backend parallel --workers 8
+./gol.py --init-random .3 --size 120 --backend numpy --half-blocks
+./gol.py --init-random .3 --size 1000 --backend bits --headless --generations 1000
+./gol.py --init-random .3 --size 100 --backend numpy --detect-cycles
+./gol.py --load gosper_glider_gun.rle --size 60 --backend numpy
+./gol.py --init-random .3 --size 2000 --backend bits --snapshot run.golsnap --checkpoint-every 100
+./gol.py --resume run.golsnap --size 2000 --backend bits
+./gol.py --init-random .3 --size 150 --backend numpy --pipeline --update-interval .05
 
 Get the full help with
 ./gol.py --help
@@ -16,11 +28,22 @@ Get the full help with
 """
 
 import argparse
-import os
 import sys
 import time
 
-from board import Board
+from backends import (
+    BACKENDS,
+    UNBOUNDED_BACKENDS,
+    advance,
+    board_array,
+    initialize_randomly,
+    load_cells,
+    make_board,
+)
+from cycles import BoardCycleDetector
+from patterns import load_pattern, read_snapshot, write_snapshot
+from pipeline import Pipeline
+from renderer import TerminalRenderer
 
 
 def main():
@@ -28,7 +51,24 @@ def main():
         prog="Game of Life", description="Run the Game of Life!"
     )
     parser.add_argument(
-        "--size", help="The size of the board (square)", type=int, default=20
+        "--size",
+        help="The size of the board (square), 0 for an unbounded board "
+        f"({' and '.join(sorted(UNBOUNDED_BACKENDS))} backends only)",
+        type=int,
+        default=20,
+    )
+    parser.add_argument(
+        "--backend",
+        help="The implementation of the board",
+        choices=list(BACKENDS),
+        default="cells",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="The number of worker processes for the parallel backend "
+        "(default: all cores)",
+        default=None,
     )
     parser.add_argument(
         "--update-interval",
@@ -36,6 +76,78 @@ def main():
         type=float,
         default=0.2,
     )
+    parser.add_argument(
+        "--jump",
+        type=int,
+        metavar="K",
+        help="Only display every 2**K-th generation "
+        "(a single step with the hashlife backend)",
+        default=0,
+    )
+    parser.add_argument(
+        "--half-blocks",
+        action="store_true",
+        help="Draw two rows of cells per line with Unicode half blocks",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Do not display the board, only report the generations per second "
+        "(requires --generations)",
+    )
+    parser.add_argument(
+        "--generations",
+        type=int,
+        metavar="N",
+        help="Stop after N generations (default: continue until Ctrl+C)",
+        default=None,
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Calculate the generations ahead in a separate thread and drop frames "
+        "when the display falls behind",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        metavar="N",
+        help="How many frames may be calculated ahead with --pipeline",
+        default=8,
+    )
+    parser.add_argument(
+        "--detect-cycles",
+        action="store_true",
+        help="Stop when the board repeats an earlier state (still life or cycle), with "
+        "--headless the remaining generations are skipped",
+    )
+    parser.add_argument(
+        "--load",
+        metavar="FILE",
+        help="Load a pattern into the top left corner "
+        "(RLE if FILE ends with .rle, plaintext otherwise)",
+        default=None,
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="FILE",
+        help="Continue from a snapshot written with --snapshot",
+        default=None,
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="FILE",
+        help="Write a snapshot of the board to FILE at the end (also when cancelled)",
+        default=None,
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        metavar="N",
+        help="Additionally write the snapshot every N generations "
+        "(requires --snapshot)",
+        default=None,
+    )
     parser.add_argument(
         "--insert-blinker",
         type=int,
@@ -59,22 +171,134 @@ def main():
         help="Initialize the alive state of each cell with the given probability for being alive",
         default=None,
     )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed for --init-random "
+        "(the same seed gives the same board for all backends)",
+        default=None,
+    )
     args = parser.parse_args()
+    if args.size == 0 and args.backend not in UNBOUNDED_BACKENDS:
+        parser.error(
+            f"--size 0 requires one of the backends {sorted(UNBOUNDED_BACKENDS)}"
+        )
+    if args.size == 0 and args.init_random is not None:
+        parser.error("--init-random requires a bounded board (--size > 0)")
+    if args.headless and args.generations is None:
+        parser.error("--headless requires --generations")
+    if args.detect_cycles and args.jump != 0:
+        parser.error("--detect-cycles requires --jump 0")
+    if args.checkpoint_every is not None and args.snapshot is None:
+        parser.error("--checkpoint-every requires --snapshot")
+    if args.pipeline and args.headless:
+        parser.error("--pipeline can not be combined with --headless")
 
-    b = Board(args.size)
+    options = {"workers": args.workers} if args.backend == "parallel" else {}
+    b = make_board(args.backend, args.size, **options)
+    generation = 0
+    if args.resume is not None:
+        cells, generation = read_snapshot(args.resume)
+        load_cells(b, cells)
+    if args.load is not None:
+        load_cells(b, load_pattern(args.load))
     if args.insert_blinker is not None:
         b.insert_blinker(*args.insert_blinker)
     if args.insert_glider is not None:
         b.insert_glider(*args.insert_glider)
     if args.init_random is not None:
-        b.initialize_randomly(args.init_random)
+        initialize_randomly(b, args.init_random, args.seed)
+
+    renderer = None if args.headless else TerminalRenderer(half_blocks=args.half_blocks)
+    detector = BoardCycleDetector(b) if args.detect_cycles else None
+    if detector is not None:
+        detector.record(generation)
+    step = 2**args.jump
+    first_generation = generation
+    stop = None if args.generations is None else generation + args.generations
+    next_checkpoint = (
+        None if args.checkpoint_every is None else generation + args.checkpoint_every
+    )
+    computed = 0  # generations that were actually calculated
+    cycle = None
+
+    def after_step(generation):
+        """
+        write checkpoints and check for cycles, returns True if the board is in a cycle
+        """
+        nonlocal next_checkpoint, cycle
+        if next_checkpoint is not None and generation >= next_checkpoint:
+            write_snapshot(args.snapshot, board_array(b), generation)
+            next_checkpoint += args.checkpoint_every
+        if detector is not None:
+            detector.update()
+            cycle = detector.record(generation)
+        return cycle is not None
 
-    while True:  # continue until user interrupts
-        os.system("clear")  # clear terminal
-        b.print()  # print the current generation
-        b.update_board()  # determine the next generation
-        print("Press Ctrl+C to cancel")
-        time.sleep(args.update_interval)  # wait for some time for display purposes
+    start = time.perf_counter()
+    try:
+        if args.pipeline:
+            pipeline = Pipeline(
+                b,
+                renderer,
+                step,
+                args.update_interval,
+                generation,
+                stop,
+                args.queue_size,
+                after_step,
+            )
+            try:
+                pipeline.run()
+            finally:
+                generation, computed = pipeline.generation, pipeline.computed
+        else:
+            while stop is None or generation < stop:
+                if renderer is not None:
+                    # the flipped cells are only known if the last frame was the
+                    # previous generation
+                    changed = getattr(b, "changed", None) if step == 1 else None
+                    renderer.render(
+                        board_array(b),
+                        f"Generation {generation}, press Ctrl+C to cancel",
+                        changed=changed if computed > 0 else None,
+                    )
+                # determine the next (2**K-th) generation, the last step ends at the
+                # stop generation
+                generations = step if stop is None else min(step, stop - generation)
+                advance(b, generations)
+                generation += generations
+                computed += generations
+                if after_step(generation):
+                    break
+                if renderer is not None:
+                    # wait for some time for display purposes
+                    time.sleep(args.update_interval)
+        if cycle is not None and stop is not None and renderer is None:
+            # fast-forward: only the position in the cycle matters for the final state
+            remaining = (stop - generation) % cycle[1]
+            advance(b, remaining)
+            computed += remaining
+            generation = stop
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.perf_counter() - start
+        if renderer is not None:
+            renderer.close()
+        if hasattr(b, "close"):
+            b.close()  # stop worker processes
+    if args.snapshot is not None:
+        write_snapshot(args.snapshot, board_array(b), generation)
+    if cycle is not None:
+        onset, period = cycle
+        kind = "still life" if period == 1 else f"cycle with period {period}"
+        print(f"The board is a {kind} since generation {onset}")
+    if args.headless:
+        print(
+            f"{generation - first_generation} generations in {elapsed:.3f} s "
+            f"({computed / elapsed:.1f} calculated generations/second)"
+        )
     return 0
 
 
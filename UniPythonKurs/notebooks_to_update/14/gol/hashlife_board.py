@@ -0,0 +1,393 @@
+"""
+Implementation of the Hashlife algorithm for GoL and a board backend using it
+
+The board is stored as a quadtree: a node of level k represents a square of 2**k x 2**k
+cells and consists of the four quadrants of level k - 1. Nodes are canonicalised (equal
+squares are the same object), so repeated structures are stored only once, and the
+future of the centre of each node is memoised. This allows to advance regular patterns
+by 2**k generations in one call.
+
+The cache of nodes and futures is evicted when it grows beyond a maximal size.
+"""
+
+import math
+
+import numpy as np
+
+from board import Board
+from cell import CellView
+from random_soup import random_cells
+
+
+class Node:
+    """
+    A square of 2**k x 2**k cells, split into the quadrants a (top left), b (top right),
+    c (bottom left) and d (bottom right). Leaves (k = 0) are single cells without
+    quadrants.
+    """
+
+    __slots__ = ("k", "a", "b", "c", "d", "n")
+
+    def __init__(self, k, a=None, b=None, c=None, d=None, n=0):
+        self.k = k
+        self.a = a
+        self.b = b
+        self.c = c
+        self.d = d
+        # number of alive cells in the square
+        self.n = n
+
+
+class Hashlife:
+    """
+    Creates canonical quadtree nodes and calculates their futures
+
+    max_cache_size -- maximal number of cached nodes and futures before the caches are
+                      evicted
+    """
+
+    def __init__(self, max_cache_size=2**22):
+        self.max_cache_size = max_cache_size
+        self.on = Node(0, n=1)
+        self.off = Node(0, n=0)
+        self._join_cache = {}
+        self._successor_cache = {}
+        self._zero_cache = {}
+        self.n_evictions = 0
+
+    def cache_size(self):
+        return len(self._join_cache) + len(self._successor_cache)
+
+    def evict(self):
+        """
+        clear all caches
+
+        Nodes that are still in use stay valid, they are just not shared anymore with
+        nodes that are created after the eviction.
+        """
+        self._join_cache.clear()
+        self._successor_cache.clear()
+        self._zero_cache.clear()
+        self.n_evictions += 1
+
+    def join(self, a, b, c, d):
+        """the canonical node with the quadrants a, b, c and d"""
+        key = (a, b, c, d)
+        node = self._join_cache.get(key)
+        if node is None:
+            if self.cache_size() >= self.max_cache_size:
+                self.evict()
+            node = Node(a.k + 1, a, b, c, d, a.n + b.n + c.n + d.n)
+            self._join_cache[key] = node
+        return node
+
+    def zero(self, k):
+        """the empty node of level k"""
+        node = self._zero_cache.get(k)
+        if node is None:
+            if k == 0:
+                node = self.off
+            else:
+                z = self.zero(k - 1)
+                node = self.join(z, z, z, z)
+            self._zero_cache[k] = node
+        return node
+
+    def centre(self, m):
+        """node of level k + 1 with m in its centre and empty cells around it"""
+        z = self.zero(m.k - 1)
+        return self.join(
+            self.join(z, z, z, m.a),
+            self.join(z, z, m.b, z),
+            self.join(z, m.c, z, z),
+            self.join(m.d, z, z, z),
+        )
+
+    def inner(self, m):
+        """the central node of level k - 1 of m"""
+        return self.join(m.a.d, m.b.c, m.c.b, m.d.a)
+
+    def life_4x4(self, m):
+        """the next generation of the central 2x2 cells of a 4x4 node"""
+        grid = [
+            [m.a.a.n, m.a.b.n, m.b.a.n, m.b.b.n],
+            [m.a.c.n, m.a.d.n, m.b.c.n, m.b.d.n],
+            [m.c.a.n, m.c.b.n, m.d.a.n, m.d.b.n],
+            [m.c.c.n, m.c.d.n, m.d.c.n, m.d.d.n],
+        ]
+        leaves = []
+        for row in (1, 2):
+            for col in (1, 2):
+                n_alive = sum(
+                    grid[row + dr][col + dc]
+                    for dr in range(-1, 2)
+                    for dc in range(-1, 2)
+                    if not dr == dc == 0
+                )
+                alive = n_alive == 3 or (n_alive == 2 and grid[row][col])
+                leaves.append(self.on if alive else self.off)
+        return self.join(*leaves)
+
+    def successor(self, m, j):
+        """
+        the central node of level k - 1 of m after 2**j generations (j <= k - 2)
+
+        Only cells inside of m are taken into account, cells outside count as dead.
+        """
+        if m.n == 0:
+            return m.a
+        key = (m, j)
+        result = self._successor_cache.get(key)
+        if result is not None:
+            return result
+
+        if m.k == 2:
+            result = self.life_4x4(m)
+        else:
+            # nine overlapping sub squares of level k - 1
+            c1 = m.a
+            c2 = self.join(m.a.b, m.b.a, m.a.d, m.b.c)
+            c3 = m.b
+            c4 = self.join(m.a.c, m.a.d, m.c.a, m.c.b)
+            c5 = self.join(m.a.d, m.b.c, m.c.b, m.d.a)
+            c6 = self.join(m.b.c, m.b.d, m.d.a, m.d.b)
+            c7 = m.c
+            c8 = self.join(m.c.b, m.d.a, m.c.d, m.d.c)
+            c9 = m.d
+            if j < m.k - 2:
+                # only take the (not advanced) centres, all generations are done in the
+                # second step
+                c1, c2, c3, c4, c5, c6, c7, c8, c9 = (
+                    self.inner(c) for c in (c1, c2, c3, c4, c5, c6, c7, c8, c9)
+                )
+                j_second = j
+            else:
+                # advance by 2**(k - 3) generations in both steps
+                c1, c2, c3, c4, c5, c6, c7, c8, c9 = (
+                    self.successor(c, j - 1)
+                    for c in (c1, c2, c3, c4, c5, c6, c7, c8, c9)
+                )
+                j_second = j - 1
+            result = self.join(
+                self.successor(self.join(c1, c2, c4, c5), j_second),
+                self.successor(self.join(c2, c3, c5, c6), j_second),
+                self.successor(self.join(c4, c5, c7, c8), j_second),
+                self.successor(self.join(c5, c6, c8, c9), j_second),
+            )
+        self._successor_cache[key] = result
+        return result
+
+
+class HashlifeBoard(Board):
+    """
+    Board backend using Hashlife
+
+    The cells live on an unbounded plane, `size` only defines the region that is shown
+    by `print` and returned by `as_array` (size=None shows the region containing alive
+    cells). Cells leaving this region therefore stay alive, while `Board` treats them as
+    dead. As long as a pattern stays inside of the board both behave the same.
+    """
+
+    def __init__(self, size=None, max_cache_size=2**22):
+        self.size = size
+        self.hashlife = Hashlife(max_cache_size)
+        self.generation = 0
+        # the root node and the (row, col) coordinates of its top left cell
+        self.root = self.hashlife.zero(max(3, math.ceil(math.log2(size or 1))))
+        self.origin = (0, 0)
+
+    def _coordinates(self, row, col):
+        """support negative indices on a bounded board like `Board`"""
+        if self.size is None:
+            return row, col
+        if not (-self.size <= row < self.size and -self.size <= col < self.size):
+            raise IndexError(f"cell ({row}, {col}) is not on the board")
+        return row % self.size, col % self.size
+
+    def __getitem__(self, rowcol):
+        """allows you to access a cell of a board object with `board[row, col]`"""
+        row, col = self._coordinates(*rowcol)
+        return CellView(self, row, col)
+
+    def _contains(self, row, col):
+        half = 2**self.root.k
+        return (
+            self.origin[0] <= row < self.origin[0] + half
+            and self.origin[1] <= col < self.origin[1] + half
+        )
+
+    def _expand(self):
+        """double the size of the root node, keeping the current root in its centre"""
+        shift = 2 ** (self.root.k - 1)
+        self.root = self.hashlife.centre(self.root)
+        self.origin = (self.origin[0] - shift, self.origin[1] - shift)
+
+    def is_cell_alive(self, row, col):
+        if not self._contains(row, col):
+            return False
+        node = self.root
+        row -= self.origin[0]
+        col -= self.origin[1]
+        while node.k > 0 and node.n > 0:
+            half = 2 ** (node.k - 1)
+            if row < half:
+                node = node.a if col < half else node.b
+            else:
+                node = node.c if col < half else node.d
+            row %= half
+            col %= half
+        return node.n > 0
+
+    def set_cell(self, row, col, alive=True):
+        while not self._contains(row, col):
+            self._expand()
+        self.root = self._set(
+            self.root, row - self.origin[0], col - self.origin[1], alive
+        )
+
+    def _set(self, node, row, col, alive):
+        """
+        return a copy of node with the cell (row, col) relative to the node set to alive
+        """
+        if node.k == 0:
+            return self.hashlife.on if alive else self.hashlife.off
+        half = 2 ** (node.k - 1)
+        a, b, c, d = node.a, node.b, node.c, node.d
+        if row < half:
+            if col < half:
+                a = self._set(a, row, col, alive)
+            else:
+                b = self._set(b, row, col - half, alive)
+        else:
+            if col < half:
+                c = self._set(c, row - half, col, alive)
+            else:
+                d = self._set(d, row - half, col - half, alive)
+        return self.hashlife.join(a, b, c, d)
+
+    def alive_cells(self):
+        """return a list with the (row, col) coordinates of all alive cells"""
+        cells = []
+
+        def collect(node, row, col):
+            if node.n == 0:
+                return
+            if node.k == 0:
+                cells.append((row, col))
+                return
+            half = 2 ** (node.k - 1)
+            collect(node.a, row, col)
+            collect(node.b, row, col + half)
+            collect(node.c, row + half, col)
+            collect(node.d, row + half, col + half)
+
+        collect(self.root, *self.origin)
+        return cells
+
+    def population(self):
+        """number of alive cells"""
+        return self.root.n
+
+    def _window(self):
+        """(min_row, min_col, max_row, max_col) of the region that is shown"""
+        if self.size is not None:
+            return 0, 0, self.size - 1, self.size - 1
+        cells = self.alive_cells()
+        if not cells:
+            return None
+        rows, cols = zip(*cells)
+        return min(rows), min(cols), max(rows), max(cols)
+
+    def as_array(self):
+        """return a boolean array with the alive states of the cells on the board"""
+        min_row, min_col, max_row, max_col = self._window() or (0, 0, -1, -1)
+        cells = np.zeros((max_row - min_row + 1, max_col - min_col + 1), dtype=bool)
+        for row, col in self.alive_cells():
+            if min_row <= row <= max_row and min_col <= col <= max_col:
+                cells[row - min_row, col - min_col] = True
+        return cells
+
+    def load_array(self, cells):
+        """
+        set the alive states of all cells from a boolean array (the rest of the plane is
+        dead)
+        """
+        cells = np.asarray(cells, dtype=bool)
+        k = max(3, math.ceil(math.log2(max(cells.shape + (1,)))))
+        padded = np.zeros((2**k, 2**k), dtype=bool)
+        padded[: cells.shape[0], : cells.shape[1]] = cells
+
+        def build(block):
+            if not block.any():
+                return self.hashlife.zero(int(math.log2(len(block))))
+            if len(block) == 1:
+                return self.hashlife.on
+            half = len(block) // 2
+            return self.hashlife.join(
+                build(block[:half, :half]),
+                build(block[:half, half:]),
+                build(block[half:, :half]),
+                build(block[half:, half:]),
+            )
+
+        self.root = build(padded)
+        self.origin = (0, 0)
+
+    def print(self):
+        window = self._window()
+        if window is None:
+            print()
+            return
+        print(
+            "\n".join(
+                "".join("o " if alive else "  " for alive in row)
+                for row in self.as_array()
+            )
+            + "\n"
+        )
+
+    def count_alive_neighbours(self, row, col):
+        """count the number of alive neighbours of this cell"""
+        return sum(
+            self.is_cell_alive(row + dr, col + dc)
+            for dr in range(-1, 2)
+            for dc in range(-1, 2)
+            if not dr == dc == 0
+        )
+
+    def _jump(self, j):
+        """advance by 2**j generations"""
+        hashlife = self.hashlife
+        # make sure that the pattern can not grow out of the root node during 2**j
+        # generations: all alive cells have to be in the central half and the node has
+        # to be large enough
+        while self.root.k < j + 2 or hashlife.inner(self.root).n != self.root.n:
+            self._expand()
+        # the successor of the centred root covers exactly the region of the old root
+        self.root = hashlife.successor(hashlife.centre(self.root), j)
+        self.generation += 2**j
+
+    def advance(self, generations):
+        """advance by the given number of generations"""
+        j = 0
+        while generations:
+            if generations & 1:
+                self._jump(j)
+            generations >>= 1
+            j += 1
+
+    def jump(self, k):
+        """advance by 2**k generations in one step"""
+        self._jump(k)
+
+    def update_board(self):
+        """calculate the new generation status und update THIS board"""
+        self._jump(0)
+
+    def initialize_randomly(self, alive_probability, seed=None):
+        """
+        set cells alive with `alive_probability` (between 0 and 1) and dead otherwise
+        """
+        if self.size is None:
+            raise ValueError("an unbounded board cannot be initialized randomly")
+        self.load_array(random_cells(self.size, self.size, alive_probability, seed))
@@ -0,0 +1,132 @@
+"""
+Implementation of the 2D board for GoL storing all cells in one NumPy array
+
+Instead of one `Cell` object per cell, the alive states are stored in a boolean array
+and the neighbour counts of the whole board are calculated at once with shifted sums.
+"""
+
+import numpy as np
+
+from board import Board
+from cell import CellView
+from random_soup import random_chunks
+
+
+def neighbour_counts(cells):
+    """
+    count the number of alive neighbours for all cells of the boolean array `cells`
+
+    Cells outside of the board count as dead.
+    """
+    size_r, size_c = cells.shape
+    padded = np.zeros((size_r + 2, size_c + 2), dtype=np.uint8)
+    padded[1:-1, 1:-1] = cells
+    # sum of the 3x3 blocks: first the columns, then the rows
+    vertical = padded[:-2] + padded[1:-1] + padded[2:]
+    counts = vertical[:, :-2] + vertical[:, 1:-1] + vertical[:, 2:]
+    # the cell itself is not its own neighbour
+    counts -= cells
+    return counts
+
+
+def next_generation(cells, counts):
+    """
+    the alive states of the next generation for the given states and neighbour counts
+    """
+    return (counts == 3) | (cells & (counts == 2))
+
+
+def step_rows(cells, next_cells, row_start, row_stop):
+    """
+    write the next generation of the rows [row_start, row_stop) of `cells` into
+    `next_cells`
+
+    Only the rows next to this range (the halo) are read in addition, so different row
+    ranges can be updated independently of each other.
+    """
+    lo = max(row_start - 1, 0)
+    hi = min(row_stop + 1, len(cells))
+    counts = neighbour_counts(cells[lo:hi])[row_start - lo : row_stop - lo]
+    next_cells[row_start:row_stop] = next_generation(cells[row_start:row_stop], counts)
+
+
+class NumpyBoard(Board):
+    def __init__(self, size):
+        self.size = size
+        # alive states of all cells
+        self.cells = np.zeros((size, size), dtype=bool)
+        # cells that flipped during the last update
+        self.changed = np.zeros((size, size), dtype=bool)
+        # preallocated buffers for the update: the next generation is written to the
+        # back buffer, which is then swapped with `cells`
+        self._back = np.zeros((size, size), dtype=bool)
+        self._padded = np.zeros((size + 2, size + 2), dtype=np.uint8)
+        self._vertical = np.zeros((size, size + 2), dtype=np.uint8)
+        self._counts = np.zeros((size, size), dtype=np.uint8)
+        self._survive = np.zeros((size, size), dtype=bool)
+
+    def __getitem__(self, rowcol):
+        """allows you to access a cell of a board object with `board[row, col]`"""
+        row, col = rowcol
+        return CellView(self, row, col)
+
+    def is_cell_alive(self, row, col):
+        return bool(self.cells[row, col])
+
+    def set_cell(self, row, col, alive=True):
+        self.cells[row, col] = alive
+
+    def as_array(self):
+        """return a boolean array with the alive states of all cells"""
+        return self.cells.copy()
+
+    def load_array(self, cells):
+        """set the alive states of all cells from a boolean array"""
+        self.cells[...] = cells
+
+    def print(self):
+        # build the full output first and print it at once
+        chars = np.where(self.cells, "o ", "  ")
+        print("\n".join("".join(row) for row in chars) + "\n")
+
+    def count_alive_neighbours(self, row, col):
+        """count the number of alive neighbours of this cell"""
+        block = self.cells[max(row - 1, 0) : row + 2, max(col - 1, 0) : col + 2]
+        return int(block.sum()) - int(self.cells[row, col])
+
+    def changed_cells(self):
+        """
+        return the row and column indices of the cells that flipped during the last
+        update
+        """
+        return np.nonzero(self.changed)
+
+    def update_board(self):
+        """calculate the new generation status und update THIS board"""
+        # 3x3 block sums including the cell itself, without allocating new arrays
+        padded, vertical, counts = self._padded, self._vertical, self._counts
+        padded[1:-1, 1:-1] = self.cells
+        np.add(padded[:-2], padded[1:-1], out=vertical)
+        np.add(vertical, padded[2:], out=vertical)
+        np.add(vertical[:, :-2], vertical[:, 1:-1], out=counts)
+        np.add(counts, vertical[:, 2:], out=counts)
+
+        # alive with 3 neighbours (block sum 3) or alive with 2 or 3 neighbours (block
+        # sum 3 or 4)
+        back = self._back
+        np.equal(counts, 3, out=back)
+        np.equal(counts, 4, out=self._survive)
+        self._survive &= self.cells
+        back |= self._survive
+
+        np.not_equal(self.cells, back, out=self.changed)
+        self.cells, self._back = back, self.cells
+
+    def initialize_randomly(self, alive_probability, seed=None):
+        """
+        set cells alive with `alive_probability` (between 0 and 1) and dead otherwise
+        """
+        for row_start, chunk in random_chunks(
+            self.size, self.size, alive_probability, seed
+        ):
+            self.cells[row_start : row_start + len(chunk)] = chunk
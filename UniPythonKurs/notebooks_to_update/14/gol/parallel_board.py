@@ -0,0 +1,168 @@
+"""
+Implementation of a 2D board for GoL that is updated by several processes in parallel
+
+The board is split into horizontal strips, one per worker process. Two copies of the
+board (current and next generation) are stored in `multiprocessing.shared_memory`, so
+every worker can read the halo rows next to its strip directly from its neighbours.
+After each generation all workers wait for each other before the roles of the two copies
+are swapped.
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import signal
+import threading
+
+import numpy as np
+
+from numpy_board import NumpyBoard, step_rows
+
+
+def _worker(shm_names, size, row_start, row_stop, command, start_barrier, step_barrier):
+    """
+    update the rows [row_start, row_stop) whenever the main process requests new
+    generations
+
+    command -- shared array with the index of the current buffer and the number of
+               generations to calculate (negative to stop the worker)
+    """
+    # Ctrl+C is handled by the main process, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shms = [shared_memory.SharedMemory(name=name) for name in shm_names]
+    buffers = [np.ndarray((size, size), dtype=bool, buffer=shm.buf) for shm in shms]
+    src = dst = None
+    try:
+        while True:
+            start_barrier.wait()
+            current, generations = command[0], command[1]
+            if generations < 0:
+                break
+            for generation in range(generations):
+                src = buffers[(current + generation) % 2]
+                dst = buffers[(current + generation + 1) % 2]
+                step_rows(src, dst, row_start, row_stop)
+                # all strips have to be finished before the next generation reads the
+                # halos
+                step_barrier.wait()
+    except threading.BrokenBarrierError:
+        pass  # the main process was interrupted during an update
+    finally:
+        del buffers, src, dst
+        for shm in shms:
+            shm.close()
+
+
+class ParallelBoard(NumpyBoard):
+    def __init__(self, size, workers=None):
+        self.size = size
+        self.n_workers = max(1, min(workers or os.cpu_count(), size))
+        # two copies of the board in shared memory: current and next generation
+        self._shms = [
+            shared_memory.SharedMemory(create=True, size=size * size) for _ in range(2)
+        ]
+        self._buffers = [
+            np.ndarray((size, size), dtype=bool, buffer=shm.buf) for shm in self._shms
+        ]
+        for buffer in self._buffers:
+            buffer[...] = False
+        self._current = 0
+        self.cells = self._buffers[self._current]
+        # cells that flipped during the last update
+        self.changed = np.zeros((size, size), dtype=bool)
+        self._processes = None
+        self._busy = False
+        self._previous = None  # state before the running update
+
+    def _start_workers(self):
+        self._command = multiprocessing.Array("q", 2, lock=False)
+        self._start_barrier = multiprocessing.Barrier(self.n_workers + 1)
+        self._step_barrier = multiprocessing.Barrier(self.n_workers + 1)
+        bounds = np.linspace(0, self.size, self.n_workers + 1).astype(int)
+        self._processes = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(
+                    [shm.name for shm in self._shms],
+                    self.size,
+                    row_start,
+                    row_stop,
+                    self._command,
+                    self._start_barrier,
+                    self._step_barrier,
+                ),
+                daemon=True,
+            )
+            for row_start, row_stop in zip(bounds[:-1], bounds[1:])
+        ]
+        for process in self._processes:
+            process.start()
+
+    def advance(self, generations):
+        """
+        advance by the given number of generations (`changed` marks the cells that
+        differ afterwards)
+        """
+        if generations <= 0:
+            return
+        # during one generation the workers only write to the other buffer, afterwards
+        # they also overwrite the buffer of `cells`
+        self._previous = self.cells if generations == 1 else self.cells.copy()
+        if self._processes is None:
+            self._start_workers()
+        self._command[0] = self._current
+        self._command[1] = generations
+        self._busy = True
+        self._start_barrier.wait()
+        for _ in range(generations):
+            self._step_barrier.wait()
+        self._current = (self._current + generations) % 2
+        self.cells = self._buffers[self._current]
+        self._busy = False
+        np.not_equal(self._previous, self.cells, out=self.changed)
+        self._previous = None
+
+    def changed_cells(self):
+        """
+        return the row and column indices of the cells that flipped during the last
+        update
+        """
+        return np.nonzero(self.changed)
+
+    def update_board(self):
+        """calculate the new generation status und update THIS board"""
+        self.advance(1)
+
+    def close(self):
+        """
+        stop the worker processes and free the shared memory (no updates are possible
+        afterwards)
+        """
+        if self._processes is not None:
+            if self._busy:
+                # interrupted during an update: release the waiting workers and return
+                # to the state before the update, the buffers may hold a partial
+                # generation
+                self._start_barrier.abort()
+                self._step_barrier.abort()
+                self.cells = self._previous
+                self._busy = False
+            else:
+                self._command[1] = -1
+                self._start_barrier.wait()
+            for process in self._processes:
+                process.join()
+            self._processes = None
+        if self._shms:
+            self.cells = self.cells.copy()
+            self._buffers = []
+            for shm in self._shms:
+                shm.close()
+                shm.unlink()
+            self._shms = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,298 @@
+"""
+Reading and writing GoL patterns and snapshots of boards
+
+Patterns are read from and written to the two common text formats:
+- RLE (run length encoded, usually `.rle`), e.g. `x = 3, y = 3` followed by `bo$2bo$3o!`
+- plaintext (usually `.cells`), one line per row with `.` for dead and `O` for alive
+  cells
+
+The readers process the file line by line and return a boolean array with the alive
+states.
+
+Snapshots store a board in a compact binary format: a small header followed by the rows
+of the board with 8 cells per byte (`np.packbits`), optionally compressed with zlib. A
+range of rows can be read from a snapshot, for uncompressed snapshots only these rows
+are read from disk. Snapshots are written to a temporary file first, so an interrupted
+write never destroys the previous snapshot.
+"""
+
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+# number of lines of the body of a RLE file that are decoded at once
+_RLE_CHUNK_LINES = 10000
+# the only rule the boards implement (in the two common notations)
+_LIFE_RULES = {"b3/s23", "23/3"}
+# maximal length of the lines of written RLE files
+_RLE_LINE_LENGTH = 70
+
+SNAPSHOT_MAGIC = b"GOLSNAP1"
+# magic, length of the json header
+_PREFIX = struct.Struct("<8sQ")
+_ALIGNMENT = 64
+
+
+def _decode_rle(text, row, col):
+    """
+    decode a part of the body of a RLE file, starting at the position (row, col)
+
+    A run is an optional count followed by a tag (b: dead, $: end of row, !: end of
+    pattern, o or any other letter: alive). All runs are decoded at once with array
+    operations.
+
+    Returns the arrays rows, cols and lengths of the runs of alive cells, the position
+    after the decoded text, the digits at the end of the text that belong to the next
+    run and whether the end of the pattern was reached.
+    """
+    data = np.frombuffer(text.encode(), dtype=np.uint8)
+    end = np.flatnonzero(data == ord("!"))
+    finished = len(end) > 0
+    if finished:
+        data = data[: end[0]]
+    data = data[data > ord(" ")]  # skip whitespace
+    is_digit = (data >= ord("0")) & (data <= ord("9"))
+    tag_positions = np.flatnonzero(~is_digit)
+    n_tags = len(tag_positions)
+    carry = data[tag_positions[-1] + 1 if n_tags else 0 :].tobytes().decode()
+    tags = data[tag_positions]
+
+    # the counts: the digits in front of each tag (1 without digits)
+    digit_positions = np.flatnonzero(is_digit[: len(data) - len(carry)])
+    owners = np.searchsorted(tag_positions, digit_positions)
+    digits = (data[digit_positions] - ord("0")) * 10.0 ** (
+        tag_positions[owners] - 1 - digit_positions
+    )
+    counts = np.bincount(owners, weights=digits, minlength=n_tags).astype(np.int64)
+    counts[np.bincount(owners, minlength=n_tags) == 0] = 1
+
+    # rows: increased by the "$" runs, columns: increased by the others and reset by "$"
+    new_row = tags == ord("$")
+    rows = row + np.cumsum(np.where(new_row, counts, 0))
+    steps = np.where(new_row, 0, counts)
+    ends = np.cumsum(steps)
+    last_new_row = np.maximum.accumulate(np.where(new_row, np.arange(n_tags), -1))
+    row_starts = np.where(last_new_row >= 0, ends[last_new_row], -col)
+    cols = ends - steps - row_starts
+
+    alive = ~new_row & (tags != ord("b"))
+    if n_tags:
+        row, col = int(rows[-1]), int(ends[-1] - row_starts[-1])
+    return rows[alive], cols[alive], counts[alive], row, col, carry, finished
+
+
+def read_rle(lines):
+    """read a pattern in RLE format from an iterable of lines (e.g. an open file)"""
+    width = height = 0
+    runs = []
+    row = col = 0
+    carry = ""
+    chunk = []
+    finished = False
+    header = False
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if not header and line.startswith("x"):
+            # e.g. "x = 3, y = 3, rule = B3/S23"
+            fields = dict(
+                (key.strip(), value.strip())
+                for key, value in (field.split("=") for field in line.split(","))
+            )
+            width, height = int(fields["x"]), int(fields["y"])
+            rule = fields.get("rule", "B3/S23")
+            if rule.lower() not in _LIFE_RULES:
+                raise ValueError(f"unsupported rule {rule} (only B3/S23 is supported)")
+            header = True
+            continue
+        header = True
+        chunk.append(line)
+        if len(chunk) >= _RLE_CHUNK_LINES or "!" in line:
+            *decoded, row, col, carry, finished = _decode_rle(
+                carry + "".join(chunk), row, col
+            )
+            runs.append(decoded)
+            chunk = []
+            if finished:
+                break
+    if not finished:
+        *decoded, row, col, carry, finished = _decode_rle(
+            carry + "".join(chunk), row, col
+        )
+        runs.append(decoded)
+
+    rows, cols, lengths = (np.concatenate(arrays) for arrays in zip(*runs))
+    shape = (
+        max(height, int(rows.max()) + 1 if len(rows) else 0),
+        max(width, int((cols + lengths).max()) if len(rows) else 0),
+    )
+    cells = np.zeros(shape, dtype=bool)
+    # index of each cell within its run
+    offsets = np.arange(lengths.sum()) - np.repeat(
+        np.cumsum(lengths) - lengths, lengths
+    )
+    cells[np.repeat(rows, lengths), np.repeat(cols, lengths) + offsets] = True
+    return cells
+
+
+def write_rle(f, cells, comment=None):
+    """write the boolean array `cells` in RLE format to the open text file `f`"""
+    cells = np.asarray(cells, dtype=bool)
+    height, width = cells.shape
+    if comment is not None:
+        f.write(f"#C {comment}\n")
+    f.write(f"x = {width}, y = {height}, rule = B3/S23\n")
+
+    line = []
+    line_length = 0
+
+    def emit(n, tag):
+        nonlocal line_length
+        token = f"{n}{tag}" if n > 1 else tag
+        if line_length + len(token) > _RLE_LINE_LENGTH:
+            f.write("".join(line) + "\n")
+            line.clear()
+            line_length = 0
+        line.append(token)
+        line_length += len(token)
+
+    # end of rows that were not written yet (empty rows are merged into one "n$")
+    pending_rows = 0
+    for row in cells:
+        # starts and stops of the runs of alive cells
+        edges = np.flatnonzero(np.diff(row, prepend=False, append=False))
+        if len(edges) == 0:
+            pending_rows += 1
+            continue
+        if pending_rows:
+            emit(pending_rows, "$")
+        stop = 0
+        for start, next_stop in zip(edges[0::2].tolist(), edges[1::2].tolist()):
+            if start > stop:
+                emit(start - stop, "b")
+            emit(next_stop - start, "o")
+            stop = next_stop
+        pending_rows = 1
+    emit(1, "!")
+    f.write("".join(line) + "\n")
+
+
+def read_plaintext(lines):
+    """
+    read a pattern in plaintext format from an iterable of lines (e.g. an open file)
+    """
+    rows = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.startswith("!"):
+            continue
+        chars = np.frombuffer(line.encode(), dtype=np.uint8)
+        rows.append((chars == ord("O")) | (chars == ord("*")))
+    cells = np.zeros(
+        (len(rows), max((len(row) for row in rows), default=0)), dtype=bool
+    )
+    for i, row in enumerate(rows):
+        cells[i, : len(row)] = row
+    return cells
+
+
+def write_plaintext(f, cells, name=None):
+    """write the boolean array `cells` in plaintext format to the open text file `f`"""
+    if name is not None:
+        f.write(f"!Name: {name}\n")
+    chars = np.where(np.asarray(cells, dtype=bool), "O", ".")
+    f.write("".join("".join(row) + "\n" for row in chars.tolist()))
+
+
+def load_pattern(fname):
+    """read a pattern file, RLE if the name ends with `.rle` and plaintext otherwise"""
+    with open(fname) as f:
+        if fname.lower().endswith(".rle"):
+            return read_rle(f)
+        return read_plaintext(f)
+
+
+def save_pattern(fname, cells):
+    """write a pattern file, RLE if the name ends with `.rle` and plaintext otherwise"""
+    with open(fname, "w") as f:
+        if fname.lower().endswith(".rle"):
+            write_rle(f, cells)
+        else:
+            write_plaintext(f, cells)
+
+
+def _data_offset(header_len):
+    """byte offset of the packed cells in a snapshot file"""
+    return -(-(_PREFIX.size + header_len) // _ALIGNMENT) * _ALIGNMENT
+
+
+def write_snapshot(fname, cells, generation=0, compress=True):
+    """
+    write the boolean array `cells` and the generation counter to a snapshot file
+
+    compress -- compress the cells with zlib (compressed snapshots can not be memory
+                mapped)
+    """
+    cells = np.asarray(cells, dtype=bool)
+    data = np.packbits(cells, axis=1, bitorder="little").tobytes()
+    if compress:
+        data = zlib.compress(data, 1)
+    header = json.dumps(
+        {
+            "rows": cells.shape[0],
+            "cols": cells.shape[1],
+            "generation": generation,
+            "compression": "zlib" if compress else None,
+        }
+    ).encode()
+    # the old snapshot is only replaced by a complete new one (checkpoints overwrite it)
+    tmp_fname = f"{os.fspath(fname)}.tmp"
+    with open(tmp_fname, "wb") as f:
+        f.write(_PREFIX.pack(SNAPSHOT_MAGIC, len(header)))
+        f.write(header)
+        f.seek(_data_offset(len(header)))
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_fname, fname)
+
+
+def read_snapshot(fname, rows=None):
+    """
+    read a snapshot file, returns the boolean array of the cells and the generation
+    counter
+
+    rows -- optional slice of the rows to read (for uncompressed snapshots and
+            contiguous rows only the bytes of these rows are read from disk, otherwise
+            the whole file is read)
+    """
+    with open(fname, "rb") as f:
+        magic, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{fname} is not a GoL snapshot file")
+        header = json.loads(f.read(header_len))
+        n_rows, cols = header["rows"], header["cols"]
+        row_bytes = -(-cols // 8)
+        selected = range(n_rows) if rows is None else range(n_rows)[rows]
+        offset = _data_offset(header_len)
+        if header["compression"] is None and selected.step == 1:
+            # only the contiguous block of the selected rows
+            f.seek(offset + selected.start * row_bytes)
+            data = f.read(len(selected) * row_bytes)
+            packed = np.frombuffer(data, dtype=np.uint8).reshape(
+                len(selected), row_bytes
+            )
+        else:
+            f.seek(offset)
+            data = f.read()
+            if header["compression"] == "zlib":
+                data = zlib.decompress(data)
+            packed = np.frombuffer(data, dtype=np.uint8).reshape(n_rows, row_bytes)
+            if rows is not None:
+                packed = packed[np.arange(selected.start, selected.stop, selected.step)]
+    cells = np.unpackbits(packed, axis=1, count=cols, bitorder="little").astype(bool)
+    return cells, header["generation"]
@@ -0,0 +1,205 @@
+"""
+Pipelined GoL runner that decouples computation and display
+
+In the simple loop of gol.py the next generation is only calculated after the last one
+was drawn and the update interval has passed. Here a compute thread calculates the
+generations ahead and puts copies of the boards into a bounded queue (it waits when the
+queue is full), while a display thread draws one frame per update interval. When drawing
+falls behind the schedule (large boards, slow terminal), the frames that are already
+overdue are dropped instead of slowing down the display even further.
+
+The status line shows the depth of the queue, the recent generation rate and the number
+of dropped frames.
+"""
+
+import queue
+import threading
+import time
+
+from backends import advance, board_array
+
+# sent through the queue by the compute thread after the last generation
+END = None
+# how often (in seconds) the threads check whether they should stop while waiting
+POLL_INTERVAL = 0.1
+
+
+class Pipeline:
+    """
+    Runs a board in a compute thread and displays it in a display thread
+
+    board           -- the board to evolve (only touched by the compute thread while
+                       running)
+    renderer        -- e.g. a `TerminalRenderer`
+    step            -- number of generations per displayed frame (the last one may be
+                       shorter)
+    update_interval -- time (in seconds) between two frames, 0 for as fast as possible
+    generation      -- the number of the current generation of the board
+    stop            -- generation to stop at (None to continue until Ctrl+C)
+    queue_size      -- how many frames may be calculated ahead
+    on_generation   -- called with the generation in the compute thread after every
+                       step, the pipeline stops when it returns True (e.g. a checkpoint
+                       or cycle check)
+    """
+
+    def __init__(
+        self,
+        board,
+        renderer,
+        step=1,
+        update_interval=0.2,
+        generation=0,
+        stop=None,
+        queue_size=8,
+        on_generation=None,
+    ):
+        self.board = board
+        self.renderer = renderer
+        self.step = step
+        self.update_interval = update_interval
+        self.generation = generation
+        self.stop = stop
+        self.on_generation = on_generation
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.computed = 0  # generations that were actually calculated
+        self.dropped = 0  # frames that were not displayed
+        self._cancel = threading.Event()
+        self._error = None
+        # generation rate over the last second
+        self._rate = 0.0
+        self._rate_time = time.perf_counter()
+        self._rate_computed = 0
+
+    def _put(self, frame):
+        """
+        put a frame into the queue, returns False if the pipeline was cancelled
+        meanwhile
+        """
+        while not self._cancel.is_set():
+            try:
+                self.frames.put(frame, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self):
+        """get the next frame, returns END if the pipeline was cancelled meanwhile"""
+        while not self._cancel.is_set():
+            try:
+                return self.frames.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        return END
+
+    def _compute(self):
+        try:
+            # the array is copied, the board may reuse its buffers afterwards
+            if not self._put((self.generation, board_array(self.board).copy())):
+                return
+            while self.stop is None or self.generation < self.stop:
+                # the last step ends at the stop generation
+                generations = self.step
+                if self.stop is not None:
+                    generations = min(generations, self.stop - self.generation)
+                advance(self.board, generations)
+                self.generation += generations
+                self.computed += generations
+                finished = self.on_generation is not None and self.on_generation(
+                    self.generation
+                )
+                frame = (self.generation, board_array(self.board).copy())
+                if not self._put(frame) or finished:
+                    return
+        except BaseException as e:
+            self._error = e
+            self._cancel.set()
+        finally:
+            self._put(END)
+
+    def _next_frame(self, deadline):
+        """
+        wait for the next frame, returns it and the (updated) deadline for displaying it
+
+        Waiting for the compute thread does not count as falling behind the schedule.
+        """
+        waited = self.frames.empty()
+        frame = self._get()
+        if waited:
+            deadline = max(deadline, time.perf_counter())
+        return frame, deadline
+
+    def _overdue_frames(self, deadline):
+        """number of frames whose display time has already passed"""
+        if self.update_interval <= 0:
+            # as fast as possible: only the newest available frame is drawn
+            return self.frames.qsize()
+        return int((time.perf_counter() - deadline) / self.update_interval)
+
+    def status(self, generation):
+        """
+        status line with the generation, queue depth, generation rate and dropped frames
+        """
+        now = time.perf_counter()
+        # (updated more often until the first generations were calculated)
+        if now - self._rate_time >= 1 or self._rate_computed == 0:
+            computed = self.computed
+            self._rate = (computed - self._rate_computed) / (now - self._rate_time)
+            self._rate_time, self._rate_computed = now, computed
+        return (
+            f"Generation {generation}, "
+            f"queue {self.frames.qsize()}/{self.frames.maxsize}, "
+            f"{self._rate:.1f} generations/s, {self.dropped} frames dropped, "
+            "press Ctrl+C to cancel"
+        )
+
+    def _display(self):
+        try:
+            frame, deadline = self._next_frame(time.perf_counter())
+            ended = frame is END
+            while not ended:
+                # skip the frames that should already have been displayed
+                for _ in range(self._overdue_frames(deadline)):
+                    try:
+                        newer = self.frames.get_nowait()
+                    except queue.Empty:
+                        break
+                    if newer is END:
+                        ended = True
+                        break
+                    frame = newer
+                    self.dropped += 1
+                    deadline += self.update_interval
+                generation, cells = frame
+                self.renderer.render(cells, self.status(generation))
+                if ended:
+                    break
+                deadline += self.update_interval
+                self._cancel.wait(max(0, deadline - time.perf_counter()))
+                frame, deadline = self._next_frame(deadline)
+                ended = frame is END
+        except BaseException as e:
+            self._error = e
+            self._cancel.set()
+
+    def run(self):
+        """
+        run until the stop generation, until `on_generation` returns True or until
+        Ctrl+C (KeyboardInterrupt is raised after both threads have finished)
+        """
+        threads = [
+            threading.Thread(target=self._compute, name="gol-compute"),
+            threading.Thread(target=self._display, name="gol-display"),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            # the main thread only waits, so Ctrl+C is noticed
+            while any(thread.is_alive() for thread in threads):
+                threads[1].join(POLL_INTERVAL)
+        finally:
+            self._cancel.set()
+            for thread in threads:
+                thread.join()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,40 @@
+"""
+Reproducible random initial states ("soups") for GoL
+
+The alive states are drawn with a NumPy random Generator for many cells at once instead
+of one `random.random()` call per cell. Large boards are generated in chunks of rows, so
+only the random numbers of one chunk are in memory at a time. All chunks come from the
+same random stream, so a seed gives the same soup for every chunk size and every
+backend.
+"""
+
+import numpy as np
+
+# maximal number of cells per chunk
+CHUNK_CELLS = 2**22
+
+
+def random_chunks(rows, cols, alive_probability, seed=None, chunk_cells=CHUNK_CELLS):
+    """
+    yield (row_start, chunk) with the boolean alive states of the rows starting at
+    row_start
+
+    seed -- seed of the random generator (None for a random soup)
+    """
+    rng = np.random.default_rng(seed)
+    chunk_rows = max(1, chunk_cells // max(cols, 1))
+    for row_start in range(0, rows, chunk_rows):
+        n_rows = min(chunk_rows, rows - row_start)
+        yield row_start, rng.random(
+            (n_rows, cols), dtype=np.float32
+        ) < alive_probability
+
+
+def random_cells(rows, cols, alive_probability, seed=None, chunk_cells=CHUNK_CELLS):
+    """boolean array (rows, cols) with cells alive with `alive_probability`"""
+    cells = np.empty((rows, cols), dtype=bool)
+    for row_start, chunk in random_chunks(
+        rows, cols, alive_probability, seed, chunk_cells
+    ):
+        cells[row_start : row_start + len(chunk)] = chunk
+    return cells
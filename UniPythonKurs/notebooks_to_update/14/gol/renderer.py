@@ -0,0 +1,112 @@
+"""
+Differential terminal renderer for GoL
+
+Instead of clearing the terminal and printing the whole board for every generation, the
+renderer remembers the last frame and only redraws the characters that changed, using
+ANSI escape sequences to move the cursor. Each frame is collected in one string and
+written at once.
+
+With `half_blocks=True` two rows of cells are drawn in one line of Unicode half blocks,
+so the board needs only half the lines (and one character per cell instead of two).
+"""
+
+import sys
+
+import numpy as np
+
+# ANSI escape sequences
+CLEAR_SCREEN = "\x1b[2J"
+CLEAR_LINE = "\x1b[K"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+
+
+def move_cursor(line, column):
+    """escape sequence to move the cursor to the (1-based) line and column"""
+    return f"\x1b[{line};{column}H"
+
+
+# characters for (top alive) + 2 * (bottom alive) in half block mode
+HALF_BLOCKS = np.array([" ", "▀", "▄", "█"])
+# characters for dead and alive cells otherwise (every cell is followed by a space)
+CELLS = np.array([" ", "o"])
+
+
+class TerminalRenderer:
+    """
+    Draws boolean arrays of alive states to the terminal
+
+    stream      -- where to write the frames to (default: sys.stdout)
+    half_blocks -- draw two rows of cells per line with Unicode half blocks
+    """
+
+    def __init__(self, stream=None, half_blocks=False):
+        self.stream = stream or sys.stdout
+        self.half_blocks = half_blocks
+        # width of one character of the frame in columns of the terminal
+        self.char_width = 1 if half_blocks else 2
+        # characters of the last frame that was drawn
+        self._previous = None
+
+    def frame_chars(self, cells):
+        """array with the character for each position of the frame"""
+        cells = np.asarray(cells, dtype=bool)
+        if not self.half_blocks:
+            return CELLS[cells.view(np.uint8)]
+        if len(cells) % 2:
+            cells = np.vstack([cells, np.zeros((1, cells.shape[1]), dtype=bool)])
+        codes = cells[0::2].view(np.uint8) + 2 * cells[1::2].view(np.uint8)
+        return HALF_BLOCKS[codes]
+
+    def _changed_positions(self, chars, changed):
+        """(lines, columns) of the characters that differ from the last frame"""
+        if changed is None:
+            return np.nonzero(chars != self._previous)
+        lines, columns = np.nonzero(changed)
+        if self.half_blocks:
+            # two rows share one line, keep each character only once
+            unique = np.unique(np.stack([lines // 2, columns]), axis=1)
+            lines, columns = unique[0], unique[1]
+        return lines, columns
+
+    def render(self, cells, status="", changed=None):
+        """
+        draw the alive states `cells` (boolean array) and a status line below
+
+        changed -- optional boolean array with the cells that differ from the last drawn
+                   frame (e.g. `NumpyBoard.changed`), which saves comparing the whole
+                   frame
+        """
+        chars = self.frame_chars(cells)
+        n_lines = len(chars)
+        parts = []
+        if self._previous is None or self._previous.shape != chars.shape:
+            # first frame (or the size changed): draw everything
+            parts.append(HIDE_CURSOR + CLEAR_SCREEN + move_cursor(1, 1))
+            separator = "" if self.half_blocks else " "
+            parts.append("\n".join(separator.join(line) for line in chars.tolist()))
+        else:
+            lines, columns = self._changed_positions(chars, changed)
+            width = self.char_width
+            for line, column in zip(lines.tolist(), columns.tolist()):
+                parts.append(
+                    move_cursor(line + 1, column * width + 1) + chars[line, column]
+                )
+        parts.append(move_cursor(n_lines + 2, 1) + CLEAR_LINE + status)
+        self.stream.write("".join(parts))
+        self.stream.flush()
+        self._previous = chars
+
+    def close(self):
+        """show the cursor again and move it below the last frame"""
+        if self._previous is not None:
+            self.stream.write(move_cursor(len(self._previous) + 3, 1))
+        self.stream.write(SHOW_CURSOR)
+        self.stream.flush()
+        self._previous = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
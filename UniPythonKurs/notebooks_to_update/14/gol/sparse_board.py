@@ -0,0 +1,164 @@
+"""
+Implementation of a sparse 2D board for GoL which only stores the alive cells
+
+The board keeps a set with the (row, col) coordinates of all alive cells. A new
+generation only looks at the alive cells and their neighbours, so the time per
+generation is proportional to the number of alive cells and not to the size of the
+board. Without a size the board is unbounded (also negative coordinates are allowed).
+"""
+
+from collections import Counter
+
+import numpy as np
+
+from board import Board
+from cell import CellView
+from random_soup import random_chunks
+
+# relative coordinates of the 8 neighbours of a cell
+NEIGHBOUR_OFFSETS = [
+    (dr, dc) for dr in range(-1, 2) for dc in range(-1, 2) if not dr == dc == 0
+]
+
+
+class SparseBoard(Board):
+    def __init__(self, size=None):
+        # size=None means that the board is unbounded
+        self.size = size
+        # coordinates (row, col) of all alive cells
+        self.alive_cells = set()
+        # alive cells before the last update (a new set is created by every update, so
+        # this is not a copy), the flipped cells are only determined on request
+        self._previous_alive_cells = None
+
+    def _coordinates(self, row, col):
+        """
+        check the coordinates on a bounded board and support negative indices like
+        `Board`
+        """
+        if self.size is None:
+            return row, col
+        if not (-self.size <= row < self.size and -self.size <= col < self.size):
+            raise IndexError(f"cell ({row}, {col}) is not on the board")
+        return row % self.size, col % self.size
+
+    def __getitem__(self, rowcol):
+        """allows you to access a cell of a board object with `board[row, col]`"""
+        row, col = self._coordinates(*rowcol)
+        return CellView(self, row, col)
+
+    def is_cell_alive(self, row, col):
+        return (row, col) in self.alive_cells
+
+    def set_cell(self, row, col, alive=True):
+        if alive:
+            self.alive_cells.add((row, col))
+        else:
+            self.alive_cells.discard((row, col))
+
+    def bounding_box(self):
+        """
+        return (min_row, min_col, max_row, max_col) of the alive cells, None if there
+        are none
+        """
+        if not self.alive_cells:
+            return None
+        rows, cols = zip(*self.alive_cells)
+        return min(rows), min(cols), max(rows), max(cols)
+
+    def as_array(self):
+        """
+        return a boolean array with the alive states of all cells
+
+        An unbounded board returns the region containing the alive cells (see
+        `bounding_box`).
+        """
+        if self.size is not None:
+            min_row, min_col, max_row, max_col = 0, 0, self.size - 1, self.size - 1
+        else:
+            min_row, min_col, max_row, max_col = self.bounding_box() or (0, 0, -1, -1)
+        cells = np.zeros((max_row - min_row + 1, max_col - min_col + 1), dtype=bool)
+        if self.alive_cells:
+            rows, cols = zip(*self.alive_cells)
+            cells[np.array(rows) - min_row, np.array(cols) - min_col] = True
+        return cells
+
+    def load_array(self, cells):
+        """set the alive states of all cells from a boolean array"""
+        self.alive_cells = set(zip(*map(np.ndarray.tolist, np.nonzero(cells))))
+
+    def print(self):
+        # print the whole board if it is bounded, otherwise the region with alive cells
+        if self.size is not None:
+            min_row, min_col, max_row, max_col = 0, 0, self.size - 1, self.size - 1
+        elif (box := self.bounding_box()) is not None:
+            min_row, min_col, max_row, max_col = box
+        else:
+            print()
+            return
+        lines = []
+        for row in range(min_row, max_row + 1):
+            lines.append(
+                "".join(
+                    "o " if (row, col) in self.alive_cells else "  "
+                    for col in range(min_col, max_col + 1)
+                )
+            )
+        print("\n".join(lines) + "\n")
+
+    def count_alive_neighbours(self, row, col):
+        """count the number of alive neighbours of this cell"""
+        return sum(
+            (row + dr, col + dc) in self.alive_cells for dr, dc in NEIGHBOUR_OFFSETS
+        )
+
+    def update_board(self):
+        """calculate the new generation status und update THIS board"""
+        # only cells with an alive neighbour can be alive in the next generation
+        counts = Counter(
+            (row + dr, col + dc)
+            for row, col in self.alive_cells
+            for dr, dc in NEIGHBOUR_OFFSETS
+        )
+        alive_cells = self.alive_cells
+        next_gen_alive = {
+            rowcol
+            for rowcol, n_alive in counts.items()
+            if n_alive == 3 or (n_alive == 2 and rowcol in alive_cells)
+        }
+        if self.size is not None:
+            # cells outside of the board are dead
+            size = self.size
+            next_gen_alive = {
+                (row, col)
+                for row, col in next_gen_alive
+                if 0 <= row < size and 0 <= col < size
+            }
+        self._previous_alive_cells = alive_cells
+        self.alive_cells = next_gen_alive
+
+    def changed_cells(self):
+        """
+        return the row and column indices of the cells that flipped during the last
+        update
+        """
+        if self._previous_alive_cells is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        flipped = self._previous_alive_cells ^ self.alive_cells
+        if not flipped:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        rows, cols = zip(*flipped)
+        return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+    def initialize_randomly(self, alive_probability, seed=None):
+        """
+        set cells alive with `alive_probability` (between 0 and 1) and dead otherwise
+        """
+        if self.size is None:
+            raise ValueError("an unbounded board cannot be initialized randomly")
+        self.alive_cells = set()
+        for row_start, chunk in random_chunks(
+            self.size, self.size, alive_probability, seed
+        ):
+            rows, cols = np.nonzero(chunk)
+            self.alive_cells.update(zip((rows + row_start).tolist(), cols.tolist()))
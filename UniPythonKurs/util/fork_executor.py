@@ -0,0 +1,229 @@
+"""
+Lightweight execution of notebooks in forked processes instead of Jupyter kernels.
+
+A separate template process (the "zygote") is started with a fresh interpreter: it imports the
+usual packages (numpy, pandas, sympy, ...) and creates an IPython shell once, before the grading
+process has loaded any sample solution or grades. Every notebook is then executed in a child
+process forked from the zygote (copy-on-write), so neither interpreter start, imports nor the
+Jupyter messaging protocol have to be paid per notebook, no state is shared between notebooks
+and the student code can not find anything of the grading process in its memory.
+
+The grading process sends the cell sources to the zygote over a socket, together with the write
+end of a pipe to which the child sends the outputs of the cells as one json line per cell.
+
+The cells are run with `InteractiveShell.run_cell`, so the value of the last expression, magics,
+`display` etc. behave like in a kernel. The outputs are collected in the shape of notebook
+outputs (execute_result, display_data, stream, error).
+"""
+
+import contextlib
+import importlib
+import io
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+
+import nbformat
+
+# imported in the zygote, so forked children don't import them again
+PREIMPORTED_MODULES = ("numpy", "pandas", "sympy", "matplotlib.pyplot")
+
+
+class ForkExecutor:
+    """
+    Executes notebooks in processes forked from a separate zygote process
+
+    Use `execute(nb)` instead of `ExecutePreprocessor(...).preprocess(nb)`, errors are stored as
+    outputs like with allow_errors=True. The zygote stops when `close` is called or the grading
+    process exits.
+    """
+
+    def __init__(self, preimport=PREIMPORTED_MODULES):
+        own_socket, zygote_socket = socket.socketpair()
+        env = dict(os.environ)
+        # no windows will be opened by plots
+        env.setdefault("MPLBACKEND", "Agg")
+        with zygote_socket:
+            self._process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), str(zygote_socket.fileno()), *preimport],
+                pass_fds=[zygote_socket.fileno()],
+                stdin=subprocess.DEVNULL,
+                env=env,
+                start_new_session=True,  # Ctrl+C is handled by the grading process
+            )
+        self._socket = own_socket
+        self._replies = own_socket.makefile("rb")
+
+    def _reply(self):
+        line = self._replies.readline()
+        if not line:
+            raise RuntimeError("the zygote process of the ForkExecutor died")
+        return json.loads(line)
+
+    def execute(self, nb):
+        """execute all code cells of the notebook and store their outputs in the cells"""
+        for cell in nb.cells:
+            if cell.cell_type == "code":
+                cell.outputs = []
+                cell.execution_count = None
+        request = {
+            "cwd": os.getcwd(),
+            "cells": [
+                [index, cell.source]
+                for index, cell in enumerate(nb.cells)
+                if cell.cell_type == "code" and cell.source.strip()
+            ],
+        }
+
+        read_fd, write_fd = os.pipe()
+        pipe = os.fdopen(read_fd)
+        try:
+            try:
+                socket.send_fds(self._socket, [b"R"], [write_fd])
+            finally:
+                os.close(write_fd)  # the child holds the only write end, EOF when it exits
+            self._socket.sendall(json.dumps(request).encode() + b"\n")
+            # cells after a crash of the child have no outputs
+            for line in pipe:
+                index, execution_count, outputs = json.loads(line)
+                cell = nb.cells[index]
+                cell.execution_count = execution_count
+                cell.outputs = [nbformat.from_dict(output) for output in outputs]
+        finally:
+            pipe.close()
+            # also stops the child when the runtime limit was reached
+            self._socket.sendall(b"kill\n")
+            self._reply()
+        return nb
+
+    def close(self):
+        """stop the zygote"""
+        self._replies.close()
+        self._socket.close()
+        self._process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Zygote:
+    """
+    The template process: forks one child per request of the `ForkExecutor`
+
+    Each request is a message with the write end of a pipe (`socket.send_fds`) followed by a
+    json line {"cwd": ..., "cells": [[index, source], ...]}. After the grading process sent a
+    line "kill", the child is killed (if it still runs) and a line {"done": true} is sent back.
+    """
+
+    def __init__(self, sock, preimport):
+        self.socket = sock
+        self._requests = sock.makefile("rb")
+        for module in preimport:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
+
+        from IPython.core.interactiveshell import InteractiveShell
+        from traitlets.config import Config
+
+        config = Config()
+        config.HistoryManager.enabled = False
+        self.shell = InteractiveShell.instance(config=config)
+        # collect the results instead of printing them
+        self._outputs = []
+        self._execution_count = 0
+        self.shell.displayhook.write_output_prompt = lambda: None
+        self.shell.displayhook.write_format_data = self._execute_result
+        self.shell.display_pub.publish = self._display_data
+        self.shell._showtraceback = self._error
+
+    def _execute_result(self, format_dict, md_dict=None):
+        self._outputs.append(
+            {
+                "output_type": "execute_result",
+                "data": format_dict,
+                "metadata": md_dict or {},
+                "execution_count": self._execution_count,
+            }
+        )
+
+    def _display_data(self, data, metadata=None, source=None, **kwargs):
+        self._outputs.append(
+            {"output_type": "display_data", "data": data, "metadata": metadata or {}}
+        )
+
+    def _error(self, etype, evalue, stb):
+        # like ipykernel: the traceback is not printed but stored as output
+        self._outputs.append(
+            {
+                "output_type": "error",
+                "ename": etype.__name__,
+                "evalue": str(evalue),
+                "traceback": stb,
+            }
+        )
+
+    def _run_cell(self, source):
+        """run the source of one cell in the shell, returns the outputs"""
+        self._outputs = []
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            self.shell.run_cell(source, store_history=True)
+        outputs = [
+            {"output_type": "stream", "name": name, "text": stream.getvalue()}
+            for name, stream in (("stdout", stdout), ("stderr", stderr))
+            if stream.getvalue()
+        ]
+        return outputs + self._outputs
+
+    def _run_child(self, request, write_fd):
+        """executed in the child process: run all code cells and write their outputs"""
+        # the notebook must not talk to the zygote
+        self._requests.close()
+        self.socket.close()
+        sys.stdin = open(os.devnull)  # input() fails instead of waiting
+        os.chdir(request["cwd"])
+        with os.fdopen(write_fd, "w") as pipe:
+            for index, source in request["cells"]:
+                self._execution_count += 1
+                outputs = self._run_cell(source)
+                pipe.write(json.dumps([index, self._execution_count, outputs], default=str) + "\n")
+                pipe.flush()
+
+    def serve(self):
+        """handle requests until the grading process closes the socket"""
+        while True:
+            message, fds, _, _ = socket.recv_fds(self.socket, 1, 1)
+            if not message:
+                return
+            request = json.loads(self._requests.readline())
+            pid = os.fork()
+            if pid == 0:
+                # child: never return into the code of the zygote
+                try:
+                    self._run_child(request, fds[0])
+                finally:
+                    os._exit(0)
+            os.close(fds[0])
+            # wait for the grading process, which reads the outputs until the child exits or the
+            # runtime limit is reached
+            finished = self._requests.readline()
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            if not finished:
+                return
+            self.socket.sendall(b'{"done": true}\n')
+
+
+if __name__ == "__main__":
+    # zygote process started by ForkExecutor: fd of the socket and modules to import
+    sys.path[0] = ""  # like in a kernel: imports from the working directory, not from util/
+    Zygote(socket.socket(fileno=int(sys.argv[1])), sys.argv[2:]).serve()
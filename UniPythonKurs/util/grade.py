@@ -15,6 +15,8 @@ import argparse
 from collections import defaultdict
 import contextlib
 import csv
+import hashlib
+import json
 from operator import itemgetter
 import os
 import pathlib
@@ -29,6 +31,7 @@ import nbconvert
 import nbformat
 import pandas as pd
 
+from fork_executor import ForkExecutor
 import process_nb
 
 
@@ -74,6 +77,13 @@ def main():
         "--debug-after",
         help="start grading after this user and do not store grades"
     )
+    parser.add_argument(
+        "--executor",
+        choices=["kernel", "fork"],
+        default="kernel",
+        help="execute notebooks in Jupyter kernels or in processes forked from this one "
+        "(faster, see fork_executor.py)",
+    )
     args = parser.parse_args()
     if args.zipfile and not args.grading_csv:
         parser.error("--zip-file requires --grading-csv")
@@ -91,12 +101,13 @@ def main():
         args.zipfile = args.zipfile.expanduser().resolve()
         args.grading_csv = args.grading_csv.expanduser().resolve()
 
+    executor = ForkExecutor() if args.executor == "fork" else None
     with change_to_tempdir():
-        sample_solution, sample_eid = get_sample_solution(args.sample_solution)
+        sample_solution, sample_eid = get_sample_solution(args.sample_solution, executor)
     if args.notebook:
-        print_single_notebook_grading(args.notebook, sample_solution, sample_eid)
+        print_single_notebook_grading(args.notebook, sample_solution, sample_eid, executor)
     else:  # args.zipfile:
-        id_grades = list(bulk_grade(args.zipfile, sample_solution, sample_eid, skip_names=args.skip, debug_after=args.debug_after))
+        id_grades = list(bulk_grade(args.zipfile, sample_solution, sample_eid, skip_names=args.skip, debug_after=args.debug_after, executor=executor))
         print()
         if args.debug_after:
             print("debugging finished")
@@ -147,6 +158,10 @@ class TimeoutException(Exception):
     pass
 
 
+class InvalidNotebook(Exception):
+    """the submitted file can not be graded, the message is the feedback for the student"""
+
+
 @contextlib.contextmanager
 def runtime_limit(limit_time):
     """context manager to limit the runtime to limit_time seconds"""
@@ -162,31 +177,44 @@ def runtime_limit(limit_time):
         signal.alarm(0)
 
 
-def print_single_notebook_grading(notebook_path, sample_solution, sample_eid):
+def print_single_notebook_grading(notebook_path, sample_solution, sample_eid, executor=None):
     with change_to_tempdir():
-        points_gained, wrong_exercises, username, eid = grade_notebook(
-            notebook_path, sample_solution
-        )
+        result = grade_notebook(notebook_path, sample_solution, executor=executor)
+    print(format_single_notebook_grading(result, sample_solution, sample_eid))
+
+
+def format_single_notebook_grading(result, sample_solution, sample_eid):
+    """the text for a tutor with the result of `grade_notebook` for a single notebook"""
+    points_gained, wrong_exercises, username, eid = result
     points_max = sum(map(itemgetter("points"), sample_solution.values()))
     feedback = str(points_gained)
     if wrong_exercises:
         feedback += "<br>problem_no: expected / yours"
         for pn, txt in wrong_exercises.items():
             feedback += f"<br>{pn}: {txt}"
-    print("Username:", username)
+    lines = [f"Username: {username}"]
     if eid != sample_eid:
-        print(f"WARNING: eid {eid} does not match sample eid {sample_eid}")
-    print(f"{sum(points_gained.values())} / {points_max} {feedback}")
+        lines.append(f"WARNING: eid {eid} does not match sample eid {sample_eid}")
+    lines.append(f"{sum(points_gained.values())} / {points_max} {feedback}")
+    return "\n".join(lines)
 
 
-def bulk_grade(zipfilename, sample_solution, sample_eid, skip_names=None, debug_after=None):
-    """Generator that yields tuples (pariticpant_id, username, grade, feedback comments)"""
-    in_container = bool(
+def running_in_container():
+    """whether this runs in a singularity/apptainer/docker container"""
+    return bool(
         os.environ.get("SINGULARITY_CONTAINER")
         or os.environ.get("APPTAINER_CONTAINER")
         or os.getenv("DOCKER_PYTHON_ABK") == "1"
     )
-    if not in_container:
+
+
+def bulk_grade(zipfilename, sample_solution, sample_eid, skip_names=None, debug_after=None, executor=None):
+    """Generator that yields tuples (pariticpant_id, username, grade, feedback comments)
+
+    Submissions with identical code (see `submission_hash`) are executed only once and share the
+    result, the groups of identical submissions are printed at the end.
+    """
+    if not running_in_container():
         sys.exit(
             "Run bulk grading in a singularity/apptainer/docker container "
             "(with --containall --net --network=none).\n"
@@ -209,6 +237,10 @@ def bulk_grade(zipfilename, sample_solution, sample_eid, skip_names=None, debug_
     def sanitize(s):
         return "".join(c if c in _allowed_chars else "+" for c in s)
 
+    # pre-pass: collect the submissions and hash their contents to find identical notebooks
+    # (folder name, participant id, files, notebook files, loaded notebook, submission hash, user, eid)
+    submissions = []
+    seen = set()  # submission hashes
     for folder in iter_inputs():
         actual_folder_name = sanitize(folder.name)
         if not folder.is_dir():
@@ -221,10 +253,33 @@ def bulk_grade(zipfilename, sample_solution, sample_eid, skip_names=None, debug_
         if skip_names and any(skip_name in actual_folder_name for skip_name in skip_names):
             print("skipping", actual_folder_name)
             continue
-        print(actual_folder_name, end="")
         participant_id = int(folder.name.split("_")[2])  # the actual participant id is now the third part!
         files = list(folder.iterdir())
         notebook_files = list(filter(lambda f: f.name.endswith(".ipynb"), files))
+        nb, key, user, eid = None, None, None, None
+        if len(notebook_files) == 1:
+            try:
+                with notebook_files[0].open() as f:
+                    nb = load_notebook(f)
+            except InvalidNotebook:
+                pass  # reported by grade_notebook
+            else:
+                key = submission_hash(nb)
+                # the metadata is not hashed, identical notebooks may differ in user and eid
+                user, eid = nb.metadata.get("user", "None"), nb.metadata.get("eid", "None")
+                if key in seen:
+                    nb = None  # only the first notebook of each variant is executed
+                seen.add(key)
+        submissions.append((actual_folder_name, participant_id, files, notebook_files, nb, key, user, eid))
+    n_variants = len(seen)
+    print(f"{len(submissions)} submissions, {n_variants} distinct notebooks")
+
+    # each distinct notebook is executed once: submission hash -> (result, first folder name)
+    variants = {}
+    # submission hash -> [(participant_id, username)] to report groups of identical submissions
+    groups = defaultdict(list)
+    for actual_folder_name, participant_id, files, notebook_files, nb, key, user, own_eid in submissions:
+        print(actual_folder_name, end="")
 
         if not len(notebook_files) == 1:
             print(
@@ -234,16 +289,34 @@ def bulk_grade(zipfilename, sample_solution, sample_eid, skip_names=None, debug_
             yield participant_id, "None", 0, "No .ipynb file was submitted.", True
             continue
 
-        try:
-            with change_to_tempdir(), runtime_limit(60):
-                points_gained, wrong_exercises, username, eid = grade_notebook(
-                    notebook_files[0], sample_solution
-                )
-        except TimeoutException as e:
+        duplicate = key is not None and key in variants
+        if duplicate:
+            result, first_folder_name = variants[key]
+            print(f" [identical to {first_folder_name}]", end="")
+        else:
+            try:
+                with change_to_tempdir(), runtime_limit(60):
+                    result = grade_notebook(
+                        notebook_files[0], sample_solution, executor=executor, nb=nb
+                    )
+            except TimeoutException:
+                result = None
+            if key is not None:
+                variants[key] = (result, actual_folder_name)
+
+        if result is None:
             print("\nExecution timeout!")
+            if key is not None:
+                groups[key].append((participant_id, user))
             yield participant_id, "None", 0, "Notebook could not be executed. Does it contain an infinite loop?", True
             continue
 
+        points_gained, wrong_exercises, username, eid = result
+        if duplicate and username != "unknown-user":
+            # the result is shared, but username and eid are the ones of this submission
+            username, eid = user, own_eid
+        if key is not None:
+            groups[key].append((participant_id, username))
         grade = sum(points_gained.values())
         feedback = str(points_gained)
         if wrong_exercises:
@@ -257,26 +330,68 @@ def bulk_grade(zipfilename, sample_solution, sample_eid, skip_names=None, debug_
             print(f"WARNING: eid {eid} does not match sample eid {sample_eid}")
         yield participant_id, username, grade, feedback, eid == sample_eid
 
+    duplicate_groups = [group for group in groups.values() if len(group) > 1]
+    if duplicate_groups:
+        print()
+        print(f"{len(duplicate_groups)} group(s) of identical submissions (executed once per group):")
+        for group in duplicate_groups:
+            print("  ", ", ".join(f"{username}:{participant_id}" for participant_id, username in group))
+
+
+def submission_hash(nb):
+    """returns a hash of the parts of a loaded notebook (see `load_notebook`) that determine its grading
+
+    Only the code cells are hashed: their sources without trailing whitespace, tags and problem
+    numbers. Notebooks that differ only in the metadata (user, kernelspec, language_info, ...) or
+    in stored outputs get the same hash.
+    """
+    cells = [
+        (cell.source.rstrip(), cell.metadata.get("tags", []), cell.metadata.get("problem_number"))
+        for cell in nb.cells
+        if cell.cell_type == "code"
+    ]
+    return hashlib.sha256(json.dumps(cells, default=str).encode()).hexdigest()
+
 
-def grade_notebook(fname, sample_solution):
+class StartedKernelPreprocessor(nbconvert.preprocessors.ExecutePreprocessor):
+    """
+    ExecutePreprocessor for a kernel that was already started (e.g. from the pool of the grading
+    server): nbclient only connects a client to kernels it starts itself
+    """
+
+    @contextlib.asynccontextmanager
+    async def async_setup_kernel(self, **kwargs):
+        async with super().async_setup_kernel(**kwargs):
+            if self.kc is None:
+                await self.async_start_new_kernel_client()
+            try:
+                yield
+            finally:
+                # the kernel itself is shut down by its owner
+                self.kc.stop_channels()
+                self.kc = None
+
+
+def grade_notebook(fname, sample_solution, km=None, executor=None, nb=None):
     """returns a dictionary with points for each exercise (0 if student solution is wrong),
     a dictionary of expected/student results for wrong exercises, and the username from metadata
+
+    km: optional started `jupyter_client.KernelManager` to execute the notebook in (otherwise a
+    new kernel is started), it is not shut down afterwards
+    executor: optional `ForkExecutor` to execute the notebook instead of a kernel
+    nb: the notebook already loaded from fname with `load_notebook` (it is modified)
     """
     # use a dictionary with problem number as key, so there can be no double counting
     points_gained = {}
     wrong_exercises = {}  # problem number -> string "expected/your"
 
-    # don't use open(fname) to make it also work with zipfile.Path
-    with fname.open() as f:
+    if nb is None:
+        # don't use open(fname) to make it also work with zipfile.Path
         try:
-            nb = nbformat.reader.read(f)
-        except UnicodeDecodeError:
-            return {}, {0: "UNREADABLE"}, "unknown-user"
-
-    try:
-        nbformat.validate(nb)
-    except nbformat.ValidationError:
-        return {}, {0: "NOT A VALID NOTEBOOK FILE"}, "unknown-user"
+            with fname.open() as f:
+                nb = load_notebook(f)
+        except InvalidNotebook as e:
+            return {}, {0: str(e)}, "unknown-user", "None"
 
     username = nb.metadata.get("user", "None")
     eid = nb.metadata.get("eid", "None")
@@ -294,10 +409,15 @@ def grade_notebook(fname, sample_solution):
         # print(cell.source)
 
     # execute the notebook top-to-bottom with the custom tests appended where necessary
-    ep = nbconvert.preprocessors.ExecutePreprocessor(
-        kernel_name="python3", allow_errors=True,
-    )
-    ep.preprocess(nb)
+    if executor is not None:
+        executor.execute(nb)
+    elif km is not None:
+        StartedKernelPreprocessor(kernel_name="python3", allow_errors=True).preprocess(nb, km=km)
+    else:
+        ep = nbconvert.preprocessors.ExecutePreprocessor(
+            kernel_name="python3", allow_errors=True,
+        )
+        ep.preprocess(nb)
 
     # get problem cells
     problem_cells = [
@@ -347,15 +467,60 @@ def grade_notebook(fname, sample_solution):
     return points_gained, wrong_exercises, username, eid
 
 
-def get_sample_solution(fname):
+def _strip_outputs(obj):
+    """json object hook that drops the stored outputs and attachments of cells while parsing"""
+    if "cell_type" in obj and "source" in obj:
+        if "outputs" in obj:
+            # replaced when the notebook is executed anyway
+            obj["outputs"] = []
+            obj["execution_count"] = None
+        obj.pop("attachments", None)
+    return obj
+
+
+def load_notebook(f):
+    """read and validate a submitted notebook without its stored outputs and attachments
+
+    Large outputs (e.g. images) are dropped cell by cell while parsing, so they are never
+    converted and validated. Raises InvalidNotebook with the feedback for the student.
+    """
+    try:
+        nb_dict = json.loads(f.read(), object_hook=_strip_outputs)
+    except (UnicodeDecodeError, ValueError):
+        raise InvalidNotebook("UNREADABLE")
+    if not isinstance(nb_dict, dict):
+        raise InvalidNotebook("NOT A VALID NOTEBOOK FILE")
+
+    version = nbformat.reader.get_version(nb_dict)
+    try:
+        # nbformat keeps the validator of each version once it was created
+        validator = nbformat.validator.get_validator(*version)
+    except Exception:  # e.g. no valid version number
+        raise InvalidNotebook("NOT A VALID NOTEBOOK FILE")
+    if validator is None or version[0] not in nbformat.versions:
+        raise InvalidNotebook("NOT A VALID NOTEBOOK FILE")
+    try:
+        nb = nbformat.versions[version[0]].to_notebook_json(nb_dict, minor=version[1])
+    except Exception:
+        raise InvalidNotebook("NOT A VALID NOTEBOOK FILE")
+    if next(validator.iter_errors(nb), None) is not None:
+        raise InvalidNotebook("NOT A VALID NOTEBOOK FILE")
+    return nb
+
+
+def get_sample_solution(fname, executor=None):
     with open(fname) as f:
         nb = nbformat.reader.read(f)
     nbformat.validate(nb)
     # create an executed version to get sample solutions
-    ep = nbconvert.preprocessors.ExecutePreprocessor(
-        kernel_name="python3", allow_errors=True
-    )
-    ep.preprocess(nb)
+    # (with the same executor as the students' notebooks, so the outputs are comparable)
+    if executor is not None:
+        executor.execute(nb)
+    else:
+        ep = nbconvert.preprocessors.ExecutePreprocessor(
+            kernel_name="python3", allow_errors=True
+        )
+        ep.preprocess(nb)
     eid = nb.metadata.get("eid", "None")
     problem_number = 0
     sample_solution = {}  # problem_number: "solution dict"
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+"""
+Grade a single notebook with a running grading_server.py.
+
+Only uses the standard library, so it can be run directly on your system: the notebook is
+executed by the server in its container. The paths are sent as absolute paths, so the server
+has to see the notebook and the sample solution at the same paths (see run_grading_server.sh).
+
+./util/grading_client.py --sample-solution 07_exercise_classes.ipynb --notebook abgabe.ipynb
+./util/grading_client.py --tcp 127.0.0.1:8765 --sample-solution 07_exercise_classes.ipynb --notebook abgabe.ipynb
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import socket
+import sys
+
+DEFAULT_SOCKET = os.environ.get(
+    "PYTHON_ABK_GRADING_SOCKET", "~/.python_abk_grading/grading.sock"
+)
+DEFAULT_TOKEN_FILE = "~/.python_abk_grading/token"
+
+
+def request_grading(address, notebook, sample_solution, timeout=None, token=None):
+    """
+    send a grading request to the server, returns (ok, output)
+
+    address -- path of the Unix socket or (host, port) of a server listening on TCP
+    token -- secret of the server (only needed for TCP)
+    """
+    request = {"notebook": str(notebook), "sample_solution": str(sample_solution)}
+    if token is not None:
+        request["token"] = token
+    family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(address if isinstance(address, tuple) else str(address))
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            response = json.loads(f.readline())
+    return response["ok"], response["output"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Grade a notebook with the grading server."
+    )
+    parser.add_argument(
+        "--sample-solution",
+        help=".ipynb file with the sample solution",
+        required=True,
+        type=pathlib.Path,
+    )
+    parser.add_argument(
+        "--notebook",
+        help=".ipynb file with the notebook to be graded",
+        required=True,
+        type=pathlib.Path,
+    )
+    parser.add_argument(
+        "--socket",
+        help=f"Unix socket of the grading server (default: {DEFAULT_SOCKET})",
+        type=pathlib.Path,
+        default=pathlib.Path(DEFAULT_SOCKET),
+    )
+    parser.add_argument(
+        "--tcp",
+        metavar="HOST:PORT",
+        help="connect to a server listening on TCP instead (Docker Desktop on mac)",
+    )
+    parser.add_argument(
+        "--token-file",
+        help=f"file with the secret of a server listening on TCP (default: {DEFAULT_TOKEN_FILE})",
+        type=pathlib.Path,
+        default=pathlib.Path(DEFAULT_TOKEN_FILE),
+    )
+    parser.add_argument(
+        "--timeout",
+        help="maximal time in seconds to wait for the answer",
+        type=float,
+        default=300,
+    )
+    args = parser.parse_args()
+
+    if args.tcp:
+        host, port = args.tcp.rsplit(":", 1)
+        address = (host, int(port))
+        token = args.token_file.expanduser().read_text().strip()
+    else:
+        address = args.socket.expanduser()
+        token = None
+    try:
+        ok, output = request_grading(
+            address,
+            args.notebook.expanduser().resolve(),
+            args.sample_solution.expanduser().resolve(),
+            args.timeout,
+            token,
+        )
+    except (FileNotFoundError, ConnectionRefusedError):
+        sys.exit(
+            f"no grading server is listening on {args.tcp or args.socket} "
+            "(start run_grading_server.sh)"
+        )
+    except socket.timeout:
+        sys.exit(f"no answer from the grading server within {args.timeout} s")
+    print(output)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+"""
+Grading service for single notebooks.
+
+Grading a single notebook with grade.py imports nbconvert/pandas, executes the sample solution
+and starts a kernel every time. This server does all of that once: it listens on a local Unix
+socket, keeps the executed sample solutions (per file, until the file changes) and a pool of
+started kernels. Each kernel (and its working directory) is only used for one notebook and a new
+one is started after the answer was sent, so no state is shared between students.
+
+Send requests with grading_client.py. Like grade.py, execute this in a singularity/apptainer
+container (see run_grading_server.sh), the socket, the notebooks and the sample solutions have
+to be bound to the same paths inside of the container.
+
+Docker Desktop (mac) can not share Unix sockets between the container and the host, there the
+server listens on a TCP port instead and every request has to contain a secret token.
+
+./util/grading_server.py --socket ~/.python_abk_grading/grading.sock --preload 07_exercise_classes.ipynb
+./util/grading_server.py --tcp 0.0.0.0:8765 --token-file ~/.python_abk_grading/token
+"""
+
+import argparse
+import hmac
+import json
+import os
+import pathlib
+import shutil
+import socket
+import socketserver
+import sys
+import tempfile
+
+import jupyter_client
+
+import grade
+
+
+class KernelPool:
+    """Kernels that are started in advance, each kernel is used for one notebook only"""
+
+    def __init__(self, size=2, kernel_name="python3"):
+        self.size = size
+        self.kernel_name = kernel_name
+        self._ready = []
+        self._working_dirs = {}  # kernel manager -> temporary working directory of the kernel
+
+    def _start(self):
+        working_dir = tempfile.mkdtemp(prefix="grading_")
+        km = jupyter_client.KernelManager(kernel_name=self.kernel_name)
+        km.start_kernel(cwd=working_dir)
+        self._working_dirs[km] = working_dir
+        return km
+
+    def fill(self):
+        """start kernels until `size` kernels are ready"""
+        while len(self._ready) < self.size:
+            self._ready.append(self._start())
+
+    def acquire(self):
+        """get a started kernel that is still alive (started now if none is ready)"""
+        while self._ready:
+            km = self._ready.pop(0)
+            if km.is_alive():
+                return km
+            print("discarding a kernel that died while waiting", flush=True)
+            self.release(km)
+        return self._start()
+
+    def release(self, km):
+        """shut down a kernel after its notebook was executed and remove its working directory"""
+        try:
+            km.shutdown_kernel(now=True)
+        finally:
+            shutil.rmtree(self._working_dirs.pop(km), ignore_errors=True)
+
+    def shutdown(self):
+        while self._ready:
+            self.release(self._ready.pop())
+
+
+class SampleSolutionCache:
+    """Executed sample solutions, re-executed when the file changes"""
+
+    def __init__(self):
+        self._cache = {}  # (path, mtime) -> (sample_solution, sample_eid)
+
+    def get(self, path):
+        path = pathlib.Path(path).resolve()
+        key = (path, path.stat().st_mtime_ns)
+        if key not in self._cache:
+            # forget older versions of this file
+            self._cache = {k: v for k, v in self._cache.items() if k[0] != path}
+            print("executing sample solution", path, flush=True)
+            with grade.change_to_tempdir():
+                self._cache[key] = grade.get_sample_solution(path)
+        return self._cache[key]
+
+
+class GradingHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one request: a json line {"notebook": path, "sample_solution": path}
+
+    The answer is a json line {"ok": bool, "output": text}.
+    """
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            self.server.check_token(request.get("token"))
+            output = self.server.grade(request["notebook"], request["sample_solution"])
+            response = {"ok": True, "output": output}
+        except grade.TimeoutException:
+            response = {
+                "ok": False,
+                "output": "Notebook could not be executed. Does it contain an infinite loop?",
+            }
+        except Exception as e:
+            response = {"ok": False, "output": f"{type(e).__name__}: {e}"}
+        print(request_summary(response), flush=True)
+        try:
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+        except ConnectionError:
+            # e.g. the client stopped waiting (--timeout)
+            print("the client disconnected before the answer was sent", flush=True)
+
+
+def request_summary(response):
+    """first line of the output for the server log"""
+    return ("" if response["ok"] else "failed: ") + response["output"].splitlines()[0]
+
+
+class GradingServer(socketserver.TCPServer):
+    """
+    Handles the requests one after another in the main thread (the runtime limit uses
+    SIGALRM), the kernel pool is refilled after each answer was sent.
+
+    address -- path of a Unix socket or (host, port) for TCP
+    token -- secret that every request has to contain (None: no check)
+    """
+
+    allow_reuse_address = True
+
+    def __init__(self, address, pool, solutions, timeout, token=None):
+        self.address_family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.pool = pool
+        self.solutions = solutions
+        self.timeout = timeout
+        self.token = token
+        super().__init__(address, GradingHandler)
+
+    def check_token(self, token):
+        if self.token is not None and not hmac.compare_digest(str(token), self.token):
+            raise PermissionError("invalid token")
+
+    def grade(self, notebook, sample_solution_path):
+        sample_solution, sample_eid = self.solutions.get(sample_solution_path)
+        km = self.pool.acquire()
+        try:
+            with grade.runtime_limit(self.timeout):
+                result = grade.grade_notebook(pathlib.Path(notebook), sample_solution, km=km)
+        finally:
+            self.pool.release(km)
+        return grade.format_single_notebook_grading(result, sample_solution, sample_eid)
+
+    def shutdown_request(self, request):
+        super().shutdown_request(request)
+        try:
+            self.pool.fill()
+        except Exception as e:
+            # keep serving, acquire() starts a kernel for the next request
+            print(f"could not start a kernel: {type(e).__name__}: {e}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve grading requests for single notebooks on a Unix socket."
+    )
+    address = parser.add_mutually_exclusive_group(required=True)
+    address.add_argument(
+        "--socket",
+        help="path of the Unix socket to listen on",
+        type=pathlib.Path,
+    )
+    address.add_argument(
+        "--tcp",
+        metavar="HOST:PORT",
+        help="listen on a TCP port instead (for Docker Desktop, requires --token-file)",
+    )
+    parser.add_argument(
+        "--token-file",
+        help="file with a secret that every request has to contain",
+        type=pathlib.Path,
+    )
+    parser.add_argument(
+        "--kernels",
+        help="number of kernels that are started in advance",
+        type=int,
+        default=2,
+    )
+    parser.add_argument(
+        "--timeout",
+        help="maximal runtime in seconds for grading a notebook",
+        type=int,
+        default=60,
+    )
+    parser.add_argument(
+        "--preload",
+        nargs="*",
+        help=".ipynb files with sample solutions to execute at the start",
+        type=pathlib.Path,
+        default=[],
+    )
+    args = parser.parse_args()
+    if args.tcp and not args.token_file:
+        parser.error("--tcp requires --token-file")
+
+    if not grade.running_in_container():
+        sys.exit(
+            "Run the grading server in a singularity/apptainer/docker container "
+            "(with --containall --net --network=none).\n"
+            "Do not execute arbitrary notebooks blindly on your own system!"
+        )
+
+    token = args.token_file.expanduser().read_text().strip() if args.token_file else None
+    if args.tcp:
+        socket_path = None
+        host, port = args.tcp.rsplit(":", 1)
+        address = (host, int(port))
+    else:
+        socket_path = args.socket.expanduser().resolve()
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if socket_path.is_socket():
+            socket_path.unlink()  # left over from a previous run
+        address = str(socket_path)
+
+    solutions = SampleSolutionCache()
+    for path in args.preload:
+        solutions.get(path)
+    pool = KernelPool(args.kernels)
+    pool.fill()
+
+    server = GradingServer(address, pool, solutions, args.timeout, token)
+    if socket_path is not None:
+        os.chmod(socket_path, 0o600)  # only the own user may send notebooks
+    print("listening on", args.tcp or socket_path, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,23 @@ Process notebooks to tag cells and strip solutions.
 
 import argparse
 import ast
+import base64
 import copy
+import hashlib
 import json
+import os
+import pathlib
 import re
 
 import nbconvert
 import nbformat
 
+# placeholders that are replaced by the username (plain and base64 encoded) on retrieval
+PLACEHOLDERS = ("DUMMYUSER", "DUMMY64USER")
+MANIFEST_NAME = "manifest.json"
+# same short names as in node/get_notebook.js: 04, 04_exercise, 04_lecture
+SHORT_NAME_PATTERN = re.compile(r"^(\d\d(_exercise|_lecture)?)_.*$")
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -44,8 +54,20 @@ def main():
         action="store_true",
         help="overwrite the input files (otherwise print to stdout)",
     )
+    parser.add_argument(
+        "--deploy",
+        metavar="DIR",
+        type=pathlib.Path,
+        help="write the encoded notebooks and their manifest to this deployment directory",
+    )
     args = parser.parse_args()
 
+    if args.deploy:
+        # before anything is written, so a collision leaves the deployment untouched
+        check_short_names(args.files)
+        args.deploy.mkdir(parents=True, exist_ok=True)
+        manifest = read_manifest(args.deploy)
+
     for fname in args.files:
         with open(fname) as f:
             nb = nbformat.reader.read(f)
@@ -78,9 +100,81 @@ def main():
                 strip_solution(cell, cellex)
         if args.in_place:
             nbformat.write(nb, fname)
-        else:
+        if args.deploy:
+            short_name, entry = deploy_notebook(nb, fname, args.deploy)
+            previous = manifest["notebooks"].get(short_name)
+            if previous is not None and previous["file"] != entry["file"]:
+                print(f"WARNING: {short_name} was {previous['file']} and is now {entry['file']}")
+            manifest["notebooks"][short_name] = entry
+        if not args.in_place and not args.deploy:
             print(nbformat.writes(nb))
 
+    # written once after all notebooks, so the manifest never points to missing files
+    if args.deploy:
+        write_atomically(args.deploy / MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True) + "\n")
+
+
+def read_manifest(deploy_dir):
+    """the manifest of previous deployments in this directory (or an empty one)"""
+    try:
+        with open(deploy_dir / MANIFEST_NAME) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"version": 1, "notebooks": {}}
+
+
+def write_atomically(path, content):
+    """
+    students may read the deployment at any time: write to a temporary file and rename it,
+    so readers see either the old or the new file
+    """
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(content)
+    os.replace(tmp_path, path)
+
+
+def short_name(fname):
+    """the name under which node/get_notebook.js offers the notebook, e.g. 04 or 04_exercise"""
+    m = SHORT_NAME_PATTERN.match(pathlib.Path(fname).name.removesuffix(".ipynb"))
+    if m is None:
+        raise ValueError(f"cannot deploy {fname}: the name has to start with two digits and '_'")
+    return m.group(1)
+
+
+def check_short_names(fnames):
+    """raise a ValueError if two of the notebooks would be deployed under the same short name"""
+    seen = {}  # short name -> file name
+    for fname in fnames:
+        name = short_name(fname)
+        if name in seen:
+            raise ValueError(
+                f"cannot deploy both {seen[name]} and {fname}: their short name is {name}"
+            )
+        seen[name] = fname
+
+
+def deploy_notebook(nb, fname, deploy_dir):
+    """
+    write the base64 encoded notebook to the deployment directory
+
+    returns: short name and manifest entry with the file name, the size of the encoded file,
+    the sha256 of the decoded notebook and the byte offsets of the placeholders in it
+    """
+    name = pathlib.Path(fname).name.removesuffix(".ipynb")
+    content = nbformat.writes(nb).encode()
+    encoded = base64.b64encode(content).decode()
+    write_atomically(deploy_dir / name, encoded)
+    entry = {
+        "file": name,
+        "size": len(encoded),
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "offsets": {
+            placeholder: [match.start() for match in re.finditer(re.escape(placeholder.encode()), content)]
+            for placeholder in PLACEHOLDERS
+        },
+    }
+    return short_name(fname), entry
+
 
 def problem_points(cell):
     """returns: number of points if the cell contains a problem, None otherwise"""
@@ -0,0 +1,77 @@
+#!/usr/bin/env bash
+
+# Start the grading server for single notebooks in a container, then grade notebooks with
+#   ./util/grading_client.py --sample-solution SOLUTION.ipynb --notebook NOTEBOOK.ipynb
+# or with docker (mac, the container has network access, see below) with
+#   GRADING_ALLOW_NETWORK=1 ./util/run_grading_server.sh docker
+#   ./util/grading_client.py --tcp 127.0.0.1:8765 --sample-solution SOLUTION.ipynb --notebook NOTEBOOK.ipynb
+
+action() {
+    local shell_is_zsh="$( [ -z "${ZSH_VERSION}" ] && echo "false" || echo "true" )"
+    local this_file="$( ${shell_is_zsh} && echo "${(%):-%x}" || echo "${BASH_SOURCE[0]}" )"
+    local this_dir="$( cd "$( dirname "${this_file}" )" && pwd )"
+    local abk_dir="$( cd "$( dirname "${this_dir}" )" && pwd )"
+    local teaching_dir="${HOME}/UHH/teaching/python_abk_ss25"
+
+    # sample solutions that are executed at the start (others are executed on the first request)
+    local PRELOAD="${abk_dir}/07_exercise_classes.ipynb"
+
+    # the socket, the notebooks and the sample solutions are bound to the same paths inside of
+    # the container, so the client can send its paths
+    local socket_dir="${HOME}/.python_abk_grading"
+    mkdir -p "${socket_dir}"
+    chmod 700 "${socket_dir}"
+
+    local container_engine
+    if [ -z "${container_engine}" ]; then
+        if [ ! -z "${1}" ]; then
+            container_engine="${1}"
+        elif [ "$( uname -s )" = "Darwin" ]; then
+            # use docker on mac
+            container_engine="docker"
+        else
+            # use singularity in all other cases
+            container_engine="singularity"
+        fi
+    fi
+
+    if [ "${container_engine}" = "singularity" ]; then
+        singularity exec \
+            --containall \
+            --net \
+            --network=none \
+            --bind ./util:$HOME/util:ro \
+            --bind "${abk_dir}":"${abk_dir}":ro \
+            --bind "${teaching_dir}":"${teaching_dir}":ro \
+            --bind "${socket_dir}":"${socket_dir}" \
+            singularity/python3.9.2.sif \
+            ./util/grading_server.py --socket "${socket_dir}/grading.sock" --preload ${PRELOAD}
+    elif [ "${container_engine}" = "docker" ]; then
+        # Docker Desktop can not share Unix sockets with the host: listen on a TCP port that is
+        # only published on 127.0.0.1 and require a secret token that only this user can read.
+        # The published port needs a network, so unlike all other containers of the grading
+        # scripts the student notebooks are executed WITH network access. This has to be
+        # allowed explicitly.
+        if [ "${GRADING_ALLOW_NETWORK}" != "1" ]; then
+            >&2 echo "the docker grading server executes the notebooks with network access,"
+            >&2 echo "set GRADING_ALLOW_NETWORK=1 to allow it or use ./util/run_single_nb_grading.sh"
+            return "1"
+        fi
+        local port="8765"
+        ( umask 077 && head -c 32 /dev/urandom | od -An -tx1 | tr -d ' \n' > "${socket_dir}/token" )
+        docker run \
+            --rm \
+            -ti \
+            -p "127.0.0.1:${port}:${port}" \
+            -v "${abk_dir}":"${abk_dir}":ro \
+            -v "${teaching_dir}":"${teaching_dir}":ro \
+            -v "${socket_dir}":"${socket_dir}":ro \
+            -v "${abk_dir}/util":/root/util:ro \
+            python_abk \
+            ./util/grading_server.py --tcp "0.0.0.0:${port}" --token-file "${socket_dir}/token" --preload ${PRELOAD}
+    else
+        >&2 "unknown container engine: '${container_engine}'"
+        return "1"
+    fi
+}
+action "$@"